@@ -2,11 +2,11 @@ import json
 import os
 import re
 import warnings
-from typing import Any, List, Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 
 import ee
 
-from ee_extra.Apps.utils import _get_apps
+from ee_extra.Apps.utils import _get_apps, _get_apps_index
 
 
 def apps(online: bool = False) -> dict:
@@ -27,3 +27,60 @@ def apps(online: bool = False) -> dict:
         "https://jstnbraaten.users.earthengine.app/view/conus-cover-vis"
     """
     return _get_apps(online)
+
+
+def searchApps(
+    query: Optional[str] = None,
+    user: Optional[str] = None,
+    token: bool = False,
+    offset: int = 0,
+    limit: Optional[int] = 50,
+    online: bool = False,
+) -> dict:
+    """Searches the Google Earth Engine Apps by user and by URL, with paging.
+
+    The indexes are built once per version of the apps list, so searches do not scan
+    or copy the whole list.
+
+    Args:
+        query : Text the app URL must contain (case-insensitive). If token is True,
+            words that must all be words of the app name instead (e.g. "ndvi" matches
+            ".../view/ndvi-explorer" but not ".../view/myndvi").
+        user : User the apps must belong to (case-insensitive).
+        token : Whether to match query against the words of the app name.
+        offset : Number of matching apps to skip.
+        limit : Maximum number of apps to return. If None, all of them.
+        online : Whether to search the most recent list of apps from the GitHub
+            repository and not the local copy.
+
+    Returns:
+        Dictionary with the total number of matching apps ('total') and the URLs of the
+        requested page ('apps').
+
+    Examples:
+        >>> from ee_extra.Apps.core import searchApps
+        >>> searchApps("ndvi", limit=10)
+        >>> searchApps(user="jstnbraaten", offset=10, limit=10)
+    """
+    return _get_apps_index(online).search(query, user, token, offset, limit)
+
+
+def topAppUsers(
+    offset: int = 0, limit: Optional[int] = 10, online: bool = False
+) -> List[Tuple[str, int]]:
+    """Gets the users with the most Google Earth Engine Apps, with paging.
+
+    Args:
+        offset : Number of users to skip.
+        limit : Maximum number of users to return. If None, all of them.
+        online : Whether to use the most recent list of apps from the GitHub repository
+            and not the local copy.
+
+    Returns:
+        List of (user, number of apps) tuples, most apps first.
+
+    Examples:
+        >>> from ee_extra.Apps.core import topAppUsers
+        >>> topAppUsers(limit=5)
+    """
+    return _get_apps_index(online).top(offset, limit)
@@ -1,14 +1,16 @@
-import json
+import bisect
 import os
 import re
-import urllib.request
+import threading
 import warnings
-from typing import Optional, Union
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple, Union
 
 import ee
-import pkg_resources
 
-from ee_extra.utils import _load_JSON
+from ee_extra.utils import _load_JSON, _load_online_JSON, _thaw
+
+_APPS_URL = "https://raw.githubusercontent.com/samapriya/ee-appshot/main/app_urls.json"
 
 
 def _get_apps(online: bool) -> dict:
@@ -19,11 +21,160 @@ def _get_apps(online: bool) -> dict:
         Apps.
     """
     if online:
-        with urllib.request.urlopen(
-            "https://raw.githubusercontent.com/samapriya/ee-appshot/main/app_urls.json"
-        ) as url:
-            apps = json.loads(url.read().decode())
+        apps = _thaw(_load_online_JSON(_APPS_URL, "ee-appshot.json"))
     else:
-        apps = _load_JSON("ee-appshot.json")
+        apps = _thaw(_load_JSON("ee-appshot.json"))
 
     return apps
+
+
+class _AppsIndex:
+    """Indexes over the Google Earth Engine Apps list, built once.
+
+    Apps are stored in a flat list grouped by user, so the apps of a user are a
+    contiguous range. URLs are indexed by the lowercase tokens of their app name (the
+    last path component split on non-alphanumeric characters) and kept in a single
+    lowercase string for substring searches. Users are also ranked by their number of
+    apps.
+
+    Args:
+        apps : Dictionary of apps (list of URLs) per user.
+    """
+
+    def __init__(self, apps: Mapping) -> None:
+        self.data = apps
+        self.users: Dict[str, Tuple[int, int]] = {}
+        self.urls: List[str] = []
+        for user, urls in apps.items():
+            start = len(self.urls)
+            self.urls.extend(urls)
+            self.users[user] = (start, len(self.urls))
+        self.lowercase = {user.lower(): user for user in self.users}
+
+        self.tokens: Dict[str, List[int]] = {}
+        for i, url in enumerate(self.urls):
+            name = url.rstrip("/").rsplit("/", 1)[-1].lower()
+            for token in set(re.findall(r"[a-z0-9]+", name)):
+                self.tokens.setdefault(token, []).append(i)
+
+        self.text = "\n".join(url.lower() for url in self.urls)
+        self.starts = []
+        position = 0
+        for url in self.urls:
+            self.starts.append(position)
+            position += len(url) + 1
+
+        self.ranking = sorted(
+            ((user, end - start) for user, (start, end) in self.users.items()),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    def _substring(self, query: str, start: int, end: int) -> List[int]:
+        """Gets the apps in [start, end) whose lowercase URL contains query."""
+        found = []
+        if start >= end or "\n" in query:
+            return found
+        position = self.starts[start]
+        stop = self.starts[end - 1] + len(self.urls[end - 1])
+        while True:
+            position = self.text.find(query, position, stop)
+            if position < 0:
+                return found
+            i = bisect.bisect_right(self.starts, position) - 1
+            found.append(i)
+            # Skip to the next URL, so each app is found once.
+            position = self.starts[i] + len(self.urls[i]) + 1
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        user: Optional[str] = None,
+        token: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = 50,
+    ) -> dict:
+        """Searches apps by user and by URL.
+
+        Args:
+            query : Text the URL must contain (case-insensitive). If token is True,
+                words that must all be tokens of the app name instead.
+            user : User the apps must belong to (case-insensitive).
+            token : Whether to match query against the tokens of the app name.
+            offset : Number of matching apps to skip.
+            limit : Maximum number of apps to return. If None, all of them.
+
+        Returns:
+            Dictionary with the total number of matching apps ('total') and the URLs of
+            the requested page ('apps').
+        """
+        start, end = 0, len(self.urls)
+        if user is not None:
+            start, end = self.users.get(self.lowercase.get(user.lower()), (0, 0))
+
+        if not query:
+            matches = range(start, end)
+        elif token:
+            postings = [
+                self.tokens.get(word, [])
+                for word in re.findall(r"[a-z0-9]+", query.lower())
+            ]
+            postings.sort(key=len)
+            # A query without any word matches no app name.
+            matches = []
+            if postings:
+                matches = [i for i in postings[0] if start <= i < end]
+            for others in postings[1:]:
+                others = set(others)
+                matches = [i for i in matches if i in others]
+        else:
+            matches = self._substring(query.lower(), start, end)
+
+        stop = None if limit is None else offset + limit
+
+        return {
+            "total": len(matches),
+            "apps": [self.urls[i] for i in matches[offset:stop]],
+        }
+
+    def top(self, offset: int = 0, limit: Optional[int] = 10) -> List[Tuple[str, int]]:
+        """Gets users ranked by their number of apps.
+
+        Args:
+            offset : Number of users to skip.
+            limit : Maximum number of users to return. If None, all of them.
+
+        Returns:
+            List of (user, number of apps) tuples, most apps first.
+        """
+        stop = None if limit is None else offset + limit
+
+        return self.ranking[offset:stop]
+
+
+_apps_indexes: Dict[bool, _AppsIndex] = {}
+_apps_indexes_lock = threading.Lock()
+
+
+def _get_apps_index(online: bool) -> _AppsIndex:
+    """Gets the indexes over the apps list, building them once per version of the list.
+
+    Args:
+        online : Whether to use the most recent list of apps from the GitHub repository
+            and not the local copy.
+
+    Returns:
+        Apps index.
+    """
+    if online:
+        apps = _load_online_JSON(_APPS_URL, "ee-appshot.json")
+    else:
+        apps = _load_JSON("ee-appshot.json")
+
+    with _apps_indexes_lock:
+        index = _apps_indexes.get(online)
+    if index is None or index.data is not apps:
+        index = _AppsIndex(apps)
+        with _apps_indexes_lock:
+            _apps_indexes[online] = index
+
+    return index
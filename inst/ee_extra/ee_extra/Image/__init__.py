@@ -0,0 +1,3 @@
+from ee_extra import _lazy_module
+
+__getattr__, __dir__ = _lazy_module(__name__, ["basic"])
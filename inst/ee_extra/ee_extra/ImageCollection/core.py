@@ -5,7 +5,6 @@ import warnings
 from typing import Optional, Union
 
 import ee
-import pkg_resources
 
 from ee_extra.STAC.utils import _get_platform_STAC
 
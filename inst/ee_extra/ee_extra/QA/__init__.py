@@ -0,0 +1,5 @@
+from ee_extra import _lazy_module
+
+__getattr__, __dir__ = _lazy_module(
+    __name__, ["clouds", "decoder", "flags", "metrics", "pipelines"]
+)
@@ -1,9 +1,132 @@
+import math
+import numbers
+import time
 import warnings
-from typing import Optional, Union
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import ee
 
-from ee_extra.STAC.utils import _get_platform_STAC
+from ee_extra.QA.flags import _BIT_FLAGS, _compile_bit_flags, _mask_bit_flags
+from ee_extra.STAC.utils import (
+    _get_constant,
+    _get_function_name,
+    _get_platform_STAC,
+    _infer_asset_id,
+)
+
+# Algorithms whose output collection has a subset of the images of their input
+# collection (keeping their system:index), with the name of that input. The joins
+# made by _join_by_index() keep the primary images that have a match.
+_SUBSET = {
+    "Collection.filter": "collection",
+    "Collection.limit": "collection",
+    "Collection.map": "collection",
+    "Join.apply": "primary",
+}
+
+
+def _get_date_bounds_filters(args: Any) -> List[ee.Filter]:
+    """Recovers the date and bounds filters applied to a collection by walking its
+    client-side expression graph, without contacting the server.
+
+    Only filters on system:time_start (filterDate()) and on the footprint
+    (filterBounds()) are recovered, also when they are part of an ee.Filter.And().
+
+    Args:
+        args : An Image Collection.
+
+    Returns:
+        Date and bounds filters that all the images of the collection pass.
+    """
+    filters = []
+
+    def collect(f: Any) -> None:
+        name = _get_function_name(f.func)
+        fArgs = f.args or {}
+        if name == "Filter.and":
+            subfilters = _get_constant(fArgs.get("filters"))
+            if isinstance(subfilters, (list, tuple)):
+                for subfilter in subfilters:
+                    if isinstance(subfilter, ee.computedobject.ComputedObject):
+                        collect(subfilter)
+        elif (
+            name == "Filter.dateRangeContains"
+            and _get_constant(fArgs.get("rightField")) == "system:time_start"
+        ) or (
+            name == "Filter.intersects"
+            and _get_constant(fArgs.get("leftField")) == ".all"
+        ):
+            filters.append(f)
+
+    while isinstance(args, ee.computedobject.ComputedObject):
+        name = _get_function_name(args.func)
+        if name not in _SUBSET:
+            break
+        f = (args.args or {}).get("filter")
+        if name == "Collection.filter" and isinstance(
+            f, ee.computedobject.ComputedObject
+        ):
+            collect(f)
+        args = (args.args or {}).get(_SUBSET[name])
+
+    return filters
+
+
+def _join_by_index(
+    args: ee.ImageCollection, collection: str, name: str
+) -> ee.ImageCollection:
+    """Attaches to each image the image with the same system:index of another
+    collection (e.g. its cloud probability image).
+
+    The other collection is bounded before the join: by the date and bounds filters
+    applied to args when they can be recovered client-side, and otherwise by the date
+    range of args, so the join does not scan the whole collection.
+
+    Args:
+        args : Image Collection.
+        collection : ID of the collection to join.
+        name : Property to store the joined image in.
+
+    Returns:
+        Image Collection with the joined image of each image in the name property.
+    """
+    other = ee.ImageCollection(collection)
+
+    filters = _get_date_bounds_filters(args)
+    for f in filters:
+        other = other.filter(f)
+
+    if not any(
+        _get_function_name(f.func) == "Filter.dateRangeContains" for f in filters
+    ):
+        other = other.filterDate(
+            args.aggregate_min("system:time_start"),
+            ee.Number(args.aggregate_max("system:time_start")).add(1),
+        )
+
+    fil = ee.Filter.equals(leftField="system:index", rightField="system:index")
+
+    return ee.ImageCollection(ee.Join.saveFirst(name).apply(args, other, fil))
+
+
+def _load_by_index(args: ee.Image, collection: str) -> ee.Image:
+    """Loads the image with the same system:index as an image from another collection,
+    without a join.
+
+    Args:
+        args : Image.
+        collection : ID of the collection to load the image from.
+
+    Returns:
+        Image of the collection.
+    """
+    inferred = _infer_asset_id(args)
+    if inferred is not None and not inferred[1]:
+        return ee.Image(collection + "/" + inferred[0].split("/")[-1])
+
+    ID = ee.String(collection + "/").cat(args.get("system:index"))
+
+    return ee.Image(ee.ApiFunction.call_("Image.load", ID))
 
 
 def maskClouds(
@@ -17,6 +140,8 @@ def maskClouds(
     cloudDist: int = 1000,
     buffer: int = 250,
     cdi: Optional[float] = None,
+    shadowScale: Union[int, float] = 10,
+    platformDict: Optional[dict] = None,
 ) -> Union[ee.Image, ee.ImageCollection]:
     """Masks clouds and shadows in an image or image collection (valid just for Surface Reflectance products).
 
@@ -37,10 +162,21 @@ def maskClouds(
         cdi : Cloud Displacement Index threshold. Values below this threshold are considered potential clouds.
             A cdi = None means that the index is not used. For more info see 'Frantz, D., HaS, E., Uhl, A., Stoffels, J., Hill, J. 2018. Improvement of the Fmask algorithm for Sentinel-2 images:
             Separating clouds from bright surfaces based on parallax effects. Remote Sensing of Environment 2015: 471-481'.
-            This parameter is ignored for Landsat products.
+            The index is computed on the COPERNICUS/S2 (TOA) image with the same system:index. For image collections, the TOA images are joined to the
+            collection, so the images without a TOA image are left out of the result instead of failing. This parameter is ignored for Landsat products.
+        shadowScale : Scale in meters (m) at which cloud shadows are projected and cloud and cloud shadow objects are dilated (e.g. 10, 20, 40 or 60).
+            The resulting mask is resampled to the native grid of the image. The cost of these steps decreases with the number of pixels, i.e. with the
+            square of the scale (about 4x, 16x and 36x fewer pixels at 20, 40 and 60 m than at 10 m), and so does the memory they need, while the edges
+            of the masked objects are only located to within one pixel at that scale. Cloud objects smaller than a pixel are not removed by the 20 m
+            erosion at scales above 20 m. Use compareShadowScales() to measure the trade-off on an image. This parameter is ignored for Landsat products.
+        platformDict : Platform of x as returned by _get_platform_STAC(). If None, it is
+            resolved from x.
 
     Returns:
         Cloud-shadow masked image or image collection.
+
+    Raises:
+        ValueError : If shadowScale is not a positive number.
     """
 
     validMethods = ["cloud_prob", "qa"]
@@ -50,14 +186,21 @@ def maskClouds(
             f"'{method}' is not a valid method. Please use one of {validMethods}."
         )
 
-    def S3(args):
-        qa = args.select("quality_flags")
-        notCloud = qa.bitwiseAnd(1 << 27).eq(0)
-        return args.updateMask(notCloud)
+    if (
+        isinstance(shadowScale, bool)
+        or not isinstance(shadowScale, numbers.Real)
+        or not 0 < shadowScale < math.inf
+    ):
+        raise ValueError(
+            f"'{shadowScale}' is not a valid shadowScale. Please use a positive number "
+            "of meters (e.g. 10, 20, 40 or 60)."
+        )
 
     def S2(args):
-        def cloud_prob(img):
-            clouds = ee.Image(img.get("cloud_mask")).select("probability")
+        def cloud_prob(img, clouds=None):
+            if clouds is None:
+                clouds = ee.Image(img.get("cloud_mask"))
+            clouds = clouds.select("probability")
             isCloud = clouds.gte(prob).rename("CLOUD_MASK")
             return img.addBands(isCloud)
 
@@ -71,13 +214,9 @@ def maskClouds(
             isCloud = isCloud.Not().rename("CLOUD_MASK")
             return img.addBands(isCloud)
 
-        def CDI(img):
-            idx = img.get("system:index")
-            S2TOA = (
-                ee.ImageCollection("COPERNICUS/S2")
-                .filter(ee.Filter.eq("system:index", idx))
-                .first()
-            )
+        def CDI(img, S2TOA=None):
+            if S2TOA is None:
+                S2TOA = ee.Image(img.get("s2_toa"))
             CloudDisplacementIndex = ee.Algorithms.Sentinel2.CDI(S2TOA)
             isCloud = CloudDisplacementIndex.lt(cdi).rename("CLOUD_MASK_CDI")
             return img.addBands(isCloud)
@@ -92,10 +231,12 @@ def maskClouds(
                 ee.Number(img.get("MEAN_SOLAR_AZIMUTH_ANGLE"))
             )
             cloudProjection = img.select("CLOUD_MASK").directionalDistanceTransform(
-                shadowAzimuth, cloudDist / 10
+                shadowAzimuth, cloudDist / shadowScale
             )
             cloudProjection = (
-                cloudProjection.reproject(crs=img.select(0).projection(), scale=10)
+                cloudProjection.reproject(
+                    crs=img.select(0).projection(), scale=shadowScale
+                )
                 .select("distance")
                 .mask()
             )
@@ -108,11 +249,15 @@ def maskClouds(
                 isCloudShadow = isCloudShadow.And(img.select("CLOUD_MASK_CDI"))
             if maskShadows:
                 isCloudShadow = isCloudShadow.add(img.select("SHADOW_MASK")).gt(0)
-            isCloudShadow = (
-                isCloudShadow.focal_min(20, units="meters")
-                .focal_max(buffer * 2 / 10, units="meters")
-                .rename("CLOUD_SHADOW_MASK")
+            isCloudShadow = isCloudShadow.focal_min(20, units="meters").focal_max(
+                buffer * 2 / 10, units="meters"
             )
+            if shadowScale != 10:
+                # Dilate at the working scale instead of the scale of the request.
+                isCloudShadow = isCloudShadow.reproject(
+                    crs=img.select(0).projection(), scale=shadowScale
+                )
+            isCloudShadow = isCloudShadow.rename("CLOUD_SHADOW_MASK")
             return img.addBands(isCloudShadow)
 
         def apply_mask(img):
@@ -120,31 +265,23 @@ def maskClouds(
 
         if isinstance(x, ee.image.Image):
             if method == "cloud_prob":
-                S2Clouds = ee.ImageCollection("COPERNICUS/S2_CLOUD_PROBABILITY")
-                fil = ee.Filter.equals(
-                    leftField="system:index", rightField="system:index"
-                )
-                S2WithCloudMask = ee.Join.saveFirst("cloud_mask").apply(
-                    ee.ImageCollection(args), S2Clouds, fil
-                )
-                S2Masked = ee.ImageCollection(S2WithCloudMask).map(cloud_prob).first()
+                S2Clouds = _load_by_index(args, "COPERNICUS/S2_CLOUD_PROBABILITY")
+                S2Masked = cloud_prob(args, S2Clouds)
             elif method == "qa":
                 S2Masked = QA(args)
             if cdi != None:
-                S2Masked = CDI(S2Masked)
+                S2Masked = CDI(S2Masked, _load_by_index(args, "COPERNICUS/S2"))
             if maskShadows:
                 S2Masked = get_shadows(S2Masked)
             S2Masked = apply_mask(clean_dilate(S2Masked))
         elif isinstance(x, ee.imagecollection.ImageCollection):
+            if cdi != None:
+                args = _join_by_index(args, "COPERNICUS/S2", "s2_toa")
             if method == "cloud_prob":
-                S2Clouds = ee.ImageCollection("COPERNICUS/S2_CLOUD_PROBABILITY")
-                fil = ee.Filter.equals(
-                    leftField="system:index", rightField="system:index"
+                S2WithCloudMask = _join_by_index(
+                    args, "COPERNICUS/S2_CLOUD_PROBABILITY", "cloud_mask"
                 )
-                S2WithCloudMask = ee.Join.saveFirst("cloud_mask").apply(
-                    args, S2Clouds, fil
-                )
-                S2Masked = ee.ImageCollection(S2WithCloudMask).map(cloud_prob)
+                S2Masked = S2WithCloudMask.map(cloud_prob)
             elif method == "qa":
                 S2Masked = args.map(QA)
             if cdi != None:
@@ -155,24 +292,6 @@ def maskClouds(
 
         return S2Masked
 
-    def L8(args):
-        cloudsBitMask = 1 << 5
-        qa = args.select("pixel_qa")
-        mask = qa.bitwiseAnd(cloudsBitMask).eq(0)
-        if maskShadows:
-            cloudShadowBitMask = 1 << 3
-            mask = mask.And(qa.bitwiseAnd(cloudShadowBitMask).eq(0))
-        return args.updateMask(mask)
-
-    def L8C2(args):
-        qa = args.select("QA_PIXEL")
-        notCloud = qa.bitwiseAnd(1 << 3).eq(0)
-        if maskShadows:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 4).eq(0))
-        if maskCirrus:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 2).eq(0))
-        return args.updateMask(notCloud)
-
     def L457(args):
         qa = args.select("pixel_qa")
         cloud = qa.bitwiseAnd(1 << 5).And(qa.bitwiseAnd(1 << 7))
@@ -181,80 +300,11 @@ def maskClouds(
         mask2 = args.mask().reduce(ee.Reducer.min())
         return args.updateMask(cloud.Not()).updateMask(mask2)
 
-    def L457C2(args):
-        qa = args.select("QA_PIXEL")
-        notCloud = qa.bitwiseAnd(1 << 3).eq(0)
-        if maskShadows:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 4).eq(0))
-        return args.updateMask(notCloud)
-
-    def MOD09GA(args):
-        qa = args.select("state_1km")
-        notCloud = qa.bitwiseAnd(1 << 0).eq(0)
-        if maskShadows:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 2).eq(0))
-        if maskCirrus:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 8).eq(0))
-        return args.updateMask(notCloud)
-
-    def MCD15A3H(args):
-        qa = args.select("FparExtra_QC")
-        notCloud = qa.bitwiseAnd(1 << 5).eq(0)
-        if maskShadows:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 6).eq(0))
-        if maskCirrus:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 4).eq(0))
-        return args.updateMask(notCloud)
-
-    def MOD09Q1(args):
-        qa = args.select("State")
-        notCloud = qa.bitwiseAnd(1 << 0).eq(0)
-        if maskShadows:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 2).eq(0))
-        if maskCirrus:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 8).eq(0))
-        return args.updateMask(notCloud)
-
-    def MOD09A1(args):
-        qa = args.select("StateQA")
-        notCloud = qa.bitwiseAnd(1 << 0).eq(0)
-        if maskShadows:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 2).eq(0))
-        if maskCirrus:
-            notCloud = notCloud.And(qa.bitwiseAnd(1 << 8).eq(0))
-        return args.updateMask(notCloud)
-
-    def MOD17A2H(args):
-        qa = args.select("Psn_QC")
-        notCloud = qa.bitwiseAnd(1 << 3).eq(0)
-        return args.updateMask(notCloud)
-
-    def MOD16A2(args):
-        qa = args.select("ET_QC")
-        notCloud = qa.bitwiseAnd(1 << 3).eq(0)
-        return args.updateMask(notCloud)
-
-    def MOD13Q1A1(args):
-        qa = args.select("SummaryQA")
-        notCloud = qa.bitwiseAnd(1 << 0).eq(0)
-        return args.updateMask(notCloud)
-
     def MOD13A2(args):
         qa = args.select("SummaryQA")
         notCloud = qa.eq(0)
         return args.updateMask(notCloud)
 
-    def VNP09GA(args):
-        qf1 = args.select("QF1")
-        qf2 = args.select("QF2")
-        notCloud = qf1.bitwiseAnd(1 << 2).eq(0)
-        if maskShadows:
-            notCloud = notCloud.And(qf2.bitwiseAnd(1 << 3).eq(0))
-        if maskCirrus:
-            notCloud = notCloud.And(qf2.bitwiseAnd(1 << 6).eq(0))
-            notCloud = notCloud.And(qf2.bitwiseAnd(1 << 7).eq(0))
-        return args.updateMask(notCloud)
-
     def VNP13A1(args):
         qa = args.select("pixel_reliability")
         notCloud = qa.neq(9)
@@ -263,76 +313,110 @@ def maskClouds(
         return args.updateMask(notCloud)
 
     lookup = {
-        "COPERNICUS/S3/OLCI": S3,
         "COPERNICUS/S2_SR": S2,
         "COPERNICUS/S2_SR_HARMONIZED": S2,
-        "LANDSAT/LC08/C01/T1_SR": L8,
-        "LANDSAT/LC08/C01/T2_SR": L8,
-        "LANDSAT/LC08/C02/T1_L2": L8C2,
-        "LANDSAT/LC08/C02/T2_L2": L8C2,
-        "LANDSAT/LC09/C02/T1_L2": L8C2,
-        "LANDSAT/LC09/C02/T2_L2": L8C2,
         "LANDSAT/LE07/C01/T1_SR": L457,
         "LANDSAT/LE07/C01/T2_SR": L457,
-        "LANDSAT/LE07/C02/T1_L2": L457C2,
-        "LANDSAT/LE07/C02/T2_L2": L457C2,
         "LANDSAT/LT05/C01/T1_SR": L457,
         "LANDSAT/LT05/C01/T2_SR": L457,
-        "LANDSAT/LT05/C02/T1_L2": L457C2,
-        "LANDSAT/LT05/C02/T2_L2": L457C2,
         "LANDSAT/LT04/C01/T1_SR": L457,
         "LANDSAT/LT04/C01/T2_SR": L457,
-        "LANDSAT/LT04/C02/T1_L2": L457C2,
-        "LANDSAT/LT04/C02/T2_L2": L457C2,
-        "MODIS/006/MOD09GA": MOD09GA,
-        "MODIS/006/MCD15A3H": MCD15A3H,
-        "MODIS/006/MOD09Q1": MOD09Q1,
-        "MODIS/006/MOD09A1": MOD09A1,
-        "MODIS/006/MOD17A2H": MOD17A2H,
-        "MODIS/006/MOD16A2": MOD16A2,
-        "MODIS/006/MOD13Q1": MOD13Q1A1,
-        "MODIS/006/MOD13A1": MOD13Q1A1,
         "MODIS/006/MOD13A2": MOD13A2,
-        "MODIS/006/MYD09GA": MOD09GA,
-        "MODIS/006/MYD09Q1": MOD09Q1,
-        "MODIS/006/MYD09A1": MOD09A1,
-        "MODIS/006/MYD17A2H": MOD17A2H,
-        "MODIS/006/MYD16A2": MOD16A2,
-        "MODIS/006/MYD13Q1": MOD13Q1A1,
-        "MODIS/006/MYD13A1": MOD13Q1A1,
         "MODIS/006/MYD13A2": MOD13A2,
-        "MODIS/061/MOD09GA": MOD09GA,
-        "MODIS/061/MCD15A3H": MCD15A3H,
-        "MODIS/061/MOD09Q1": MOD09Q1,
-        "MODIS/061/MOD09A1": MOD09A1,
-        "MODIS/061/MOD17A2H": MOD17A2H,
-        "MODIS/061/MOD16A2": MOD16A2,
-        "MODIS/061/MOD13Q1": MOD13Q1A1,
-        "MODIS/061/MOD13A1": MOD13Q1A1,
         "MODIS/061/MOD13A2": MOD13A2,
-        "MODIS/061/MYD09GA": MOD09GA,
-        "MODIS/061/MYD09Q1": MOD09Q1,
-        "MODIS/061/MYD09A1": MOD09A1,
-        "MODIS/061/MYD17A2H": MOD17A2H,
-        "MODIS/061/MYD16A2": MOD16A2,
-        "MODIS/061/MYD13Q1": MOD13Q1A1,
-        "MODIS/061/MYD13A1": MOD13Q1A1,
         "MODIS/061/MYD13A2": MOD13A2,
-        "NOAA/VIIRS/001/VNP09GA": VNP09GA,
         "NOAA/VIIRS/001/VNP13A1": VNP13A1,
     }
 
-    platformDict = _get_platform_STAC(x)
+    if platformDict is None:
+        platformDict = _get_platform_STAC(x)
+
+    platform = platformDict["platform"]
+
+    if platform in _BIT_FLAGS:
+        flags = ["cloud"]
+        if maskShadows:
+            flags.append("shadow")
+        if maskCirrus:
+            flags.append("cirrus")
+        masks = _compile_bit_flags(platform, flags)
 
-    if platformDict["platform"] not in list(lookup.keys()):
+        def bitFlags(args):
+            return _mask_bit_flags(args, masks)
+
+        maskFunction = bitFlags
+    elif platform in lookup:
+        maskFunction = lookup[platform]
+    else:
         warnings.warn("This platform is not supported for cloud masking.")
         return x
-    else:
-        if isinstance(x, ee.image.Image):
-            masked = lookup[platformDict["platform"]](x)
-        elif isinstance(x, ee.imagecollection.ImageCollection):
-            if platformDict["platform"] == "COPERNICUS/S2_SR":
-                masked = lookup[platformDict["platform"]](x)
-            else:
-                masked = x.map(lookup[platformDict["platform"]])
-        return masked
+
+    if isinstance(x, ee.image.Image):
+        masked = maskFunction(x)
+    elif isinstance(x, ee.imagecollection.ImageCollection):
+        if maskFunction is S2:
+            masked = maskFunction(x)
+        else:
+            masked = x.map(maskFunction)
+    return masked
+
+
+def compareShadowScales(
+    x: ee.Image,
+    scales: Sequence[Union[int, float]] = (20, 40, 60),
+    region: Optional[ee.Geometry] = None,
+    **kwargs: Any,
+) -> Dict[Union[int, float], Dict[str, float]]:
+    """Compares the cloud and shadow masks of a Sentinel-2 image computed at several
+    values of shadowScale with the mask computed at 10 m.
+
+    Each mask is requested from Earth Engine over region at 10 m and the request is
+    timed, so the seconds include the network and the queue of Earth Engine. Earth
+    Engine caches the results of a request, so each scale should be compared on an
+    image or region that was not requested before.
+
+    Args:
+        x : Sentinel-2 Surface Reflectance image.
+        scales : Values of shadowScale to compare with 10 m.
+        region : Region to compare the masks over. If None, the footprint of x.
+        **kwargs : Other arguments of maskClouds() (e.g. method or buffer).
+
+    Returns:
+        Per scale (10 included), the fraction of the pixels of region with the same mask
+        as at 10 m ('agreement'), the fraction of masked pixels ('masked') and the
+        seconds it took to compute the mask ('seconds').
+
+    Examples:
+        >>> import ee
+        >>> from ee_extra.QA.clouds import compareShadowScales
+        >>> ee.Initialize()
+        >>> S2 = ee.ImageCollection("COPERNICUS/S2_SR").first()
+        >>> compareShadowScales(S2, region=S2.geometry().centroid().buffer(5000))
+    """
+    if region is None:
+        region = x.geometry()
+
+    def getMask(scale):
+        masked = maskClouds(x, shadowScale=scale, **kwargs)
+        return masked.select("CLOUD_SHADOW_MASK").unmask(1).rename("mask")
+
+    def mean(img):
+        stats = img.reduceRegion(
+            ee.Reducer.mean(), region, scale=10, maxPixels=1e10
+        ).getInfo()
+        return stats["mask"]
+
+    reference = getMask(10)
+    result = {}
+    for scale in [10] + [scale for scale in scales if scale != 10]:
+        mask = getMask(scale)
+        start = time.perf_counter()
+        masked = mean(mask)
+        seconds = time.perf_counter() - start
+        result[scale] = {
+            "agreement": 1.0 if scale == 10 else mean(mask.eq(reference)),
+            "masked": masked,
+            "seconds": seconds,
+        }
+
+    return result
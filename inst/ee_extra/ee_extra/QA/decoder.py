@@ -0,0 +1,205 @@
+"""Local decoding of the QA bands of downloaded rasters.
+
+The QA bands are decoded with the same bit flags that maskClouds() uses in Earth
+Engine (see ee_extra.QA.flags), so local masks are consistent with the masks computed
+in Earth Engine. The flags are compiled into one bit mask per QA band and each band is
+decoded in a single vectorized pass. Rasters are processed in chunks of rows, so memory
+mapped arrays (e.g. numpy.memmap or numpy.load(..., mmap_mode="r")) larger than the
+available memory can be decoded as well.
+
+NumPy is required to use this module.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from ee_extra.QA.flags import _BIT_FLAGS, _compile_bit_flags
+
+
+def _get_QA_bands(qa: Any, platform: str) -> Dict[str, Any]:
+    """Gets the array of each QA band of a platform.
+
+    Args:
+        qa : Array of the QA band, or dictionary of arrays keyed by QA band for
+            platforms with several QA bands.
+        platform : Platform as returned by _get_platform_STAC().
+
+    Returns:
+        Array of each QA band.
+    """
+    if platform not in _BIT_FLAGS:
+        raise Exception(
+            f"Sorry, platform not supported for QA decoding: {platform}. Supported "
+            f"platforms: {list(_BIT_FLAGS.keys())}."
+        )
+
+    bands = list(_BIT_FLAGS[platform].keys())
+
+    if not isinstance(qa, Mapping):
+        if len(bands) > 1:
+            raise Exception(
+                f"Sorry, {platform} has several QA bands. Please use a dictionary "
+                f"with the arrays of {bands}."
+            )
+        return {bands[0]: qa}
+
+    missing = [band for band in bands if band not in qa]
+    if missing:
+        raise Exception(f"Sorry, QA bands missing for {platform}: {missing}.")
+
+    return {band: qa[band] for band in bands}
+
+
+def _iter_chunks(shape: Sequence[int], chunkSize: int) -> Iterator[Any]:
+    """Splits the first axis of an array into chunks of at most chunkSize pixels.
+
+    Args:
+        shape : Shape of the array.
+        chunkSize : Maximum number of pixels per chunk. Chunks hold at least one row.
+
+    Returns:
+        Slices of the first axis, or Ellipsis for scalars.
+    """
+    if len(shape) == 0:
+        yield ...
+        return
+
+    rowSize = 1
+    for size in shape[1:]:
+        rowSize *= size
+    rows = max(1, chunkSize // max(rowSize, 1))
+
+    for start in range(0, shape[0], rows):
+        yield slice(start, start + rows)
+
+
+def _decode(
+    arrays: Dict[str, Any],
+    masks: Dict[str, int],
+    out: Optional[Any],
+    chunkSize: int,
+) -> Any:
+    """Decodes compiled bit masks into a boolean array of pixels without flags set.
+
+    Args:
+        arrays : Array of each QA band.
+        masks : Bit mask of each QA band as returned by _compile_bit_flags().
+        out : Boolean array to write the result to, or None to allocate it.
+        chunkSize : Maximum number of pixels per chunk.
+
+    Returns:
+        Boolean array that is True where none of the bits of the masks is set.
+    """
+    import numpy as np
+
+    shapes = {np.shape(array) for array in arrays.values()}
+    if len(shapes) > 1:
+        raise Exception(f"Sorry, the QA bands must have the same shape: {shapes}.")
+    shape = shapes.pop()
+
+    if out is None:
+        out = np.empty(shape, dtype=bool)
+    elif np.shape(out) != shape or out.dtype != bool:
+        raise Exception(f"Sorry, out must be a boolean array of shape {shape}.")
+
+    for chunk in _iter_chunks(shape, chunkSize):
+        result = out[chunk]
+        if not masks:
+            result[...] = True
+        for i, (band, mask) in enumerate(masks.items()):
+            flagged = np.bitwise_and(np.asarray(arrays[band][chunk]), mask)
+            if i == 0:
+                np.equal(flagged, 0, out=result)
+            else:
+                result &= flagged == 0
+
+    return out
+
+
+def maskQA(
+    qa: Any,
+    platform: str,
+    maskCirrus: bool = True,
+    maskShadows: bool = True,
+    out: Optional[Any] = None,
+    chunkSize: int = 1 << 22,
+) -> Any:
+    """Computes the cloud mask of the QA bands of a downloaded raster.
+
+    The mask is the same as the one applied by maskClouds() in Earth Engine.
+
+    Args:
+        qa : Array (e.g. numpy.ndarray or numpy.memmap) of the QA band, or
+            dictionary of arrays keyed by QA band for platforms with several QA bands
+            (e.g. {'QF1': qf1, 'QF2': qf2} for NOAA/VIIRS/001/VNP09GA).
+        platform : Platform of the raster (e.g. 'LANDSAT/LC08/C02/T1_L2').
+        maskCirrus : Whether to mask cirrus clouds.
+        maskShadows : Whether to mask cloud shadows.
+        out : Boolean array to write the mask to (e.g. a numpy.memmap for masks
+            larger than the available memory). If None, a new array is allocated.
+        chunkSize : Maximum number of pixels decoded at once.
+
+    Returns:
+        Boolean array that is True for clear pixels and False for masked pixels.
+
+    Examples:
+        >>> import numpy as np
+        >>> from ee_extra.QA.decoder import maskQA
+        >>> qa = np.load("QA_PIXEL.npy", mmap_mode="r")
+        >>> clear = maskQA(qa, "LANDSAT/LC08/C02/T1_L2")
+    """
+    flags = ["cloud"]
+    if maskShadows:
+        flags.append("shadow")
+    if maskCirrus:
+        flags.append("cirrus")
+
+    arrays = _get_QA_bands(qa, platform)
+    masks = _compile_bit_flags(platform, flags)
+
+    return _decode(arrays, masks, out, chunkSize)
+
+
+def decodeQA(
+    qa: Any,
+    platform: str,
+    flags: Optional[Sequence[str]] = None,
+    chunkSize: int = 1 << 22,
+) -> Dict[str, Any]:
+    """Decodes the flags of the QA bands of a downloaded raster.
+
+    Args:
+        qa : Array (e.g. numpy.ndarray or numpy.memmap) of the QA band, or
+            dictionary of arrays keyed by QA band for platforms with several QA bands.
+        platform : Platform of the raster (e.g. 'MODIS/061/MOD09GA').
+        flags : Flags to decode ('cloud', 'shadow' and/or 'cirrus'). If None, all the
+            flags of the platform are decoded.
+        chunkSize : Maximum number of pixels decoded at once.
+
+    Returns:
+        Boolean array of each flag that is True where the flag is set.
+
+    Examples:
+        >>> import numpy as np
+        >>> from ee_extra.QA.decoder import decodeQA
+        >>> qa = np.load("state_1km.npy")
+        >>> decoded = decodeQA(qa, "MODIS/061/MOD09GA")
+        >>> decoded["shadow"].mean()
+    """
+    import numpy as np
+
+    arrays = _get_QA_bands(qa, platform)
+
+    if flags is None:
+        flags = []
+        for bandFlags in _BIT_FLAGS[platform].values():
+            flags.extend(flag for flag in bandFlags if flag not in flags)
+
+    decoded = {}
+    for flag in flags:
+        masks = _compile_bit_flags(platform, [flag])
+        if masks:
+            clear = _decode(arrays, masks, None, chunkSize)
+            decoded[flag] = np.logical_not(clear, out=clear)
+
+    return decoded
@@ -0,0 +1,120 @@
+"""Bit flags of the QA bands used for cloud masking.
+
+Each platform is described by the bits of its QA bands that flag clouds, cloud shadows
+and cirrus. The flags selected for masking are compiled into a single bit mask per QA
+band, so masking an image takes one bitwiseAnd(mask).eq(0) per QA band instead of one
+comparison per flag. Adding a platform only requires adding its table.
+"""
+
+from typing import Dict, Sequence, Tuple
+
+import ee
+
+BitFlags = Dict[str, Dict[str, Tuple[int, ...]]]
+
+_STATE = {"cloud": (0,), "shadow": (2,), "cirrus": (8,)}
+
+_S3: BitFlags = {"quality_flags": {"cloud": (27,)}}
+_L8: BitFlags = {"pixel_qa": {"cloud": (5,), "shadow": (3,)}}
+_L8C2: BitFlags = {"QA_PIXEL": {"cloud": (3,), "shadow": (4,), "cirrus": (2,)}}
+_L457C2: BitFlags = {"QA_PIXEL": {"cloud": (3,), "shadow": (4,)}}
+_MOD09GA: BitFlags = {"state_1km": _STATE}
+_MOD09Q1: BitFlags = {"State": _STATE}
+_MOD09A1: BitFlags = {"StateQA": _STATE}
+_MCD15A3H: BitFlags = {"FparExtra_QC": {"cloud": (5,), "shadow": (6,), "cirrus": (4,)}}
+_MOD17A2H: BitFlags = {"Psn_QC": {"cloud": (3,)}}
+_MOD16A2: BitFlags = {"ET_QC": {"cloud": (3,)}}
+_MOD13Q1A1: BitFlags = {"SummaryQA": {"cloud": (0,)}}
+_VNP09GA: BitFlags = {
+    "QF1": {"cloud": (2,)},
+    "QF2": {"shadow": (3,), "cirrus": (6, 7)},
+}
+
+_BIT_FLAGS: Dict[str, BitFlags] = {
+    "COPERNICUS/S3/OLCI": _S3,
+    "LANDSAT/LC08/C01/T1_SR": _L8,
+    "LANDSAT/LC08/C01/T2_SR": _L8,
+    "LANDSAT/LC08/C02/T1_L2": _L8C2,
+    "LANDSAT/LC08/C02/T2_L2": _L8C2,
+    "LANDSAT/LC09/C02/T1_L2": _L8C2,
+    "LANDSAT/LC09/C02/T2_L2": _L8C2,
+    "LANDSAT/LE07/C02/T1_L2": _L457C2,
+    "LANDSAT/LE07/C02/T2_L2": _L457C2,
+    "LANDSAT/LT05/C02/T1_L2": _L457C2,
+    "LANDSAT/LT05/C02/T2_L2": _L457C2,
+    "LANDSAT/LT04/C02/T1_L2": _L457C2,
+    "LANDSAT/LT04/C02/T2_L2": _L457C2,
+    "MODIS/006/MCD15A3H": _MCD15A3H,
+    "MODIS/006/MOD09GA": _MOD09GA,
+    "MODIS/006/MOD09Q1": _MOD09Q1,
+    "MODIS/006/MOD09A1": _MOD09A1,
+    "MODIS/006/MOD17A2H": _MOD17A2H,
+    "MODIS/006/MOD16A2": _MOD16A2,
+    "MODIS/006/MOD13Q1": _MOD13Q1A1,
+    "MODIS/006/MOD13A1": _MOD13Q1A1,
+    "MODIS/006/MYD09GA": _MOD09GA,
+    "MODIS/006/MYD09Q1": _MOD09Q1,
+    "MODIS/006/MYD09A1": _MOD09A1,
+    "MODIS/006/MYD17A2H": _MOD17A2H,
+    "MODIS/006/MYD16A2": _MOD16A2,
+    "MODIS/006/MYD13Q1": _MOD13Q1A1,
+    "MODIS/006/MYD13A1": _MOD13Q1A1,
+    "MODIS/061/MCD15A3H": _MCD15A3H,
+    "MODIS/061/MOD09GA": _MOD09GA,
+    "MODIS/061/MOD09Q1": _MOD09Q1,
+    "MODIS/061/MOD09A1": _MOD09A1,
+    "MODIS/061/MOD17A2H": _MOD17A2H,
+    "MODIS/061/MOD16A2": _MOD16A2,
+    "MODIS/061/MOD13Q1": _MOD13Q1A1,
+    "MODIS/061/MOD13A1": _MOD13Q1A1,
+    "MODIS/061/MYD09GA": _MOD09GA,
+    "MODIS/061/MYD09Q1": _MOD09Q1,
+    "MODIS/061/MYD09A1": _MOD09A1,
+    "MODIS/061/MYD17A2H": _MOD17A2H,
+    "MODIS/061/MYD16A2": _MOD16A2,
+    "MODIS/061/MYD13Q1": _MOD13Q1A1,
+    "MODIS/061/MYD13A1": _MOD13Q1A1,
+    "NOAA/VIIRS/001/VNP09GA": _VNP09GA,
+}
+
+
+def _compile_bit_flags(platform: str, flags: Sequence[str]) -> Dict[str, int]:
+    """Compiles the selected flags of a platform into one bit mask per QA band.
+
+    Args:
+        platform : Platform as returned by _get_platform_STAC().
+        flags : Flags to select (e.g. ['cloud', 'shadow']). Flags that the platform
+            does not define are ignored.
+
+    Returns:
+        Bit mask of each QA band. QA bands without any selected flag are left out.
+    """
+    masks = {}
+    for band, bandFlags in _BIT_FLAGS[platform].items():
+        mask = 0
+        for flag in flags:
+            for bit in bandFlags.get(flag, ()):
+                mask |= 1 << bit
+        if mask:
+            masks[band] = mask
+    return masks
+
+
+def _mask_bit_flags(img: ee.Image, masks: Dict[str, int]) -> ee.Image:
+    """Masks the pixels of an image where any of the compiled bits is set.
+
+    Args:
+        img : Image to mask.
+        masks : Bit mask of each QA band as returned by _compile_bit_flags().
+
+    Returns:
+        Masked image.
+    """
+    notFlagged = None
+    for band, mask in masks.items():
+        bandNotFlagged = img.select(band).bitwiseAnd(mask).eq(0)
+        if notFlagged is None:
+            notFlagged = bandNotFlagged
+        else:
+            notFlagged = notFlagged.And(bandNotFlagged)
+    return img.updateMask(notFlagged)
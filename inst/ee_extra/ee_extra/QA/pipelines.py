@@ -4,6 +4,7 @@ import ee
 
 from ee_extra.QA.clouds import maskClouds
 from ee_extra.STAC.core import scaleAndOffset
+from ee_extra.STAC.utils import _get_platform_STAC
 
 
 def preprocess(
@@ -11,6 +12,8 @@ def preprocess(
 ) -> Union[ee.Image, ee.ImageCollection]:
     """Pre-process the image, or image collection: masks clouds and shadows, and scales and offsets the image, or image collection.
 
+    The platform of x is resolved once and shared by maskClouds() and scaleAndOffset().
+
     Parameters:
         x : Image or Image Collection to pre-process.
         **kwargs : Keywords arguments for maskClouds().
@@ -28,13 +31,17 @@ def preprocess(
         "cloudDist": 1000,
         "buffer": 250,
         "cdi": None,
+        "shadowScale": 10,
     }
 
     for key, value in maskCloudsDefault.items():
         if key not in kwargs.keys():
             kwargs[key] = value
 
+    if kwargs.get("platformDict") is None:
+        kwargs["platformDict"] = _get_platform_STAC(x)
+
     x = maskClouds(x, **kwargs)
-    x = scaleAndOffset(x)
+    x = scaleAndOffset(x, kwargs["platformDict"])
 
     return x
@@ -0,0 +1,209 @@
+"""Offline snapshots of the STACs of the GEE catalog.
+
+A STAC bundle is a ZIP file with one compressed member per dataset, named after the
+dataset ID (e.g. ``COPERNICUS/S2_SR.json``). The central directory of the ZIP file acts
+as the index, so a single STAC is read by decompressing only its own member.
+
+Bundles are built on a machine with internet access with the ee_extra-stac-bundle
+command or:
+
+    python -m ee_extra.STAC.bundle -o stac.zip [--match "COPERNICUS/*"] [ID ...]
+
+and used on machines without it by setting the EE_EXTRA_STAC_BUNDLE environment
+variable or by calling setSTACBundle(). getSTAC() then serves the STACs of the datasets
+in the bundle without any request.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence
+
+from ee_extra.fetch import _http_cache
+from ee_extra.utils import _get_dataset_records
+
+
+def _member(ID: str) -> str:
+    """Gets the name of the member of a bundle holding the STAC of a dataset."""
+    return ID + ".json"
+
+
+class _STACBundle:
+    """Read-only, thread-safe access to a STAC bundle.
+
+    The ZIP file is opened on first use and kept open.
+
+    Args:
+        path : Path of the bundle, or None for no bundle.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._members: Dict[str, zipfile.ZipInfo] = {}
+        self.path = path
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._path
+
+    @path.setter
+    def path(self, path: Optional[str]) -> None:
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+            self._zip = None
+            self._members = {}
+            self._path = os.path.expanduser(path) if path else None
+
+    def _open(self) -> Optional[zipfile.ZipFile]:
+        """Opens the bundle on first use. Must be called with the lock held."""
+        if self._zip is None and self._path is not None:
+            self._zip = zipfile.ZipFile(self._path)
+            self._members = {info.filename: info for info in self._zip.infolist()}
+        return self._zip
+
+    def get(self, ID: str) -> Optional[dict]:
+        """Gets the STAC of a dataset.
+
+        Args:
+            ID : Dataset ID.
+
+        Returns:
+            STAC of the dataset, or None if it is not in the bundle.
+        """
+        with self._lock:
+            if self._open() is None:
+                return None
+            info = self._members.get(_member(ID))
+            if info is None:
+                return None
+            data = self._zip.read(info)
+        return json.loads(data.decode())
+
+    def keys(self) -> List[str]:
+        """Gets the IDs of the datasets in the bundle."""
+        with self._lock:
+            if self._open() is None:
+                return []
+            return [name[: -len(".json")] for name in self._members]
+
+
+_stac_bundle = _STACBundle(os.environ.get("EE_EXTRA_STAC_BUNDLE"))
+
+
+def setSTACBundle(path: Optional[str]) -> None:
+    """Sets the STAC bundle that getSTAC() serves STACs from.
+
+    Datasets that are not in the bundle are still fetched from the GEE STAC catalog.
+
+    Args:
+        path : Path of the bundle built with buildSTACBundle(), or None to stop using
+            a bundle.
+
+    Examples:
+        >>> from ee_extra.STAC.bundle import setSTACBundle
+        >>> setSTACBundle("stac.zip")
+    """
+    _stac_bundle.path = path
+
+
+def buildSTACBundle(
+    output: str,
+    IDs: Optional[Sequence[str]] = None,
+    match: Optional[Sequence[str]] = None,
+    maxWorkers: int = 8,
+) -> Dict[str, Exception]:
+    """Downloads the STACs of the GEE catalog into a bundle.
+
+    The STACs are always downloaded, bypassing the HTTP cache, so the bundle holds the
+    current STACs and the cache is not filled with the whole catalog.
+
+    Args:
+        output : Path of the bundle to write.
+        IDs : Dataset IDs to include. If None (and match is None), all datasets of the
+            catalog are included.
+        match : Shell-style patterns (e.g. "COPERNICUS/*") of the dataset IDs to
+            include, in addition to IDs.
+        maxWorkers : Maximum number of concurrent downloads.
+
+    Returns:
+        Dataset IDs that could not be downloaded, with their error.
+
+    Examples:
+        >>> from ee_extra.STAC.bundle import buildSTACBundle
+        >>> buildSTACBundle("stac.zip", match=["COPERNICUS/*", "LANDSAT/*"])
+    """
+    records = _get_dataset_records()
+
+    if IDs is None and match is None:
+        selected = list(records)
+    else:
+        unknown = [ID for ID in IDs or [] if ID not in records]
+        if unknown:
+            raise Exception(
+                "Datasets not in the catalog: {}".format(", ".join(unknown))
+            )
+        selected = list(dict.fromkeys(IDs or []))
+        for pattern in match or []:
+            selected.extend(ID for ID in records if fnmatch.fnmatchcase(ID, pattern))
+        selected = list(dict.fromkeys(selected))
+
+    errors = {}
+    tmp = output + ".tmp"
+
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as bundle:
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            futures = {
+                executor.submit(_http_cache.fetch, records[ID]["href"], False): ID
+                for ID in selected
+            }
+            # Only the main thread writes, so the ZIP file needs no lock.
+            for future in as_completed(futures):
+                ID = futures[future]
+                try:
+                    bundle.writestr(_member(ID), future.result())
+                except Exception as e:
+                    errors[ID] = e
+
+    os.replace(tmp, output)
+
+    return errors
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command-line entry point to build a STAC bundle."""
+    parser = argparse.ArgumentParser(
+        prog="python -m ee_extra.STAC.bundle",
+        description="Download the STACs of the GEE catalog into an offline bundle.",
+    )
+    parser.add_argument("IDs", nargs="*", help="Dataset IDs to include.")
+    parser.add_argument("-o", "--output", required=True, help="Output bundle.")
+    parser.add_argument(
+        "-m",
+        "--match",
+        action="append",
+        help='Include the datasets matching a pattern (e.g. "COPERNICUS/*").',
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=8, help="Concurrent downloads (default: 8)."
+    )
+    args = parser.parse_args(argv)
+
+    errors = buildSTACBundle(args.output, args.IDs or None, args.match, args.jobs)
+
+    for ID, error in sorted(errors.items()):
+        print("{}: {}".format(ID, error), file=sys.stderr)
+    print(args.output)
+
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
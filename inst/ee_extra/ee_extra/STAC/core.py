@@ -1,20 +1,31 @@
-import json
 import os
 import re
-import urllib.request
 import warnings
-from typing import Optional, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterator, List, Optional, Tuple, Union
 
 import ee
-import pkg_resources
 
-from ee_extra.STAC.utils import _get_platform_STAC
-from ee_extra.utils import _load_JSON
+from ee_extra.fetch import _http_cache
+from ee_extra.STAC.bundle import _stac_bundle
+from ee_extra.STAC.utils import (
+    _get_platform_STAC,
+    _get_platforms_STAC,
+    _get_search_index,
+    _infer_band_names,
+    _resolve_platform,
+)
+from ee_extra.utils import _load_JSON_fields, _load_record, _thaw
 
 
 def getSTAC(x: Union[ee.Image, ee.ImageCollection]) -> dict:
     """Gets the STAC of the specified platform.
 
+    The STAC is read from the offline bundle if one is set and contains the platform
+    (see ee_extra.STAC.bundle). Otherwise it is fetched through the HTTP cache of
+    ee_extra.fetch, so repeated calls for the same platform do not download it again
+    (see configureCache()).
+
     Args:
         x : Image or image collection to get the STAC from.
 
@@ -29,23 +40,116 @@ def getSTAC(x: Union[ee.Image, ee.ImageCollection]) -> dict:
         >>> getSTAC(S2)
     """
     platformDict = _get_platform_STAC(x)
-    eeDict = _load_JSON()
 
-    # With requests:
-    # STAC = requests.get(eeDict[platformDict["platform"]]["href"]).json()
+    return _fetch_STAC(platformDict["platform"])
+
+
+def _fetch_STAC(platform: str) -> dict:
+    """Gets the STAC of a dataset, from the offline bundle when possible.
+
+    Args:
+        platform : Dataset ID.
+
+    Returns:
+        STAC of the dataset.
+    """
+    stac = _stac_bundle.get(platform)
+    if stac is not None:
+        return stac
+    record = _load_record("ee-catalog-ids.json", platform)
+
+    return _http_cache.fetchJSON(record["href"])
+
+
+def _get_STAC_of(x: Union[str, ee.Image, ee.ImageCollection]) -> dict:
+    """Gets the STAC of a platform given by its ID or by an image (collection).
+
+    Args:
+        x : Dataset ID, asset ID, image or image collection.
+
+    Returns:
+        STAC of the dataset.
+    """
+    if isinstance(x, str):
+        platform = _resolve_platform(x, False) or _resolve_platform(x, True)
+        if platform is None:
+            raise Exception("Sorry, satellite platform not supported!")
+    else:
+        platform = _get_platform_STAC(x)["platform"]
+
+    return _fetch_STAC(platform)
 
-    # With urllib:
-    with urllib.request.urlopen(eeDict[platformDict["platform"]]["href"]) as url:
-        STAC = json.loads(url.read().decode())
 
-    return STAC
+def getSTACs(
+    x: List[Union[str, ee.Image, ee.ImageCollection]], maxWorkers: int = 8
+) -> Iterator[Tuple[Any, Optional[dict], Optional[Exception]]]:
+    """Gets the STACs of many platforms concurrently.
 
+    The platforms of the images and image collections that cannot be resolved
+    client-side are requested in a single getInfo() call. STACs are then fetched by a
+    pool of threads sharing the keep-alive connections and the HTTP cache of
+    ee_extra.fetch. Results are yielded as soon as they are available, so they may not
+    follow the order of x. A failure only affects its own item. Closing the iterator
+    early cancels the pending requests.
 
-def getScaleParams(x: Union[ee.Image, ee.ImageCollection]) -> dict:
+    Args:
+        x : List of dataset IDs, asset IDs, images or image collections.
+        maxWorkers : Maximum number of concurrent requests.
+
+    Returns:
+        Iterator of (item, STAC, error) tuples, where item is the element of x, STAC
+        is None if it failed and error is the exception raised (None on success).
+
+    Examples:
+        >>> import ee
+        >>> from ee_extra.STAC.core import getSTACs
+        >>> ee.Initialize()
+        >>> IDs = ["COPERNICUS/S2_SR", "LANDSAT/LC08/C01/T1_SR", "MODIS/006/MOD13A2"]
+        >>> for ID, stac, error in getSTACs(IDs):
+        ...     print(ID, error or stac["title"])
+    """
+    if maxWorkers < 1:
+        raise Exception("maxWorkers must be a positive integer!")
+
+    items = list(x)
+
+    try:
+        platforms = _get_platforms_STAC(items, strict=False)
+    except Exception:
+        # Resolve each item on its own, so that a failure only affects its own item.
+        platforms = None
+
+    def fetch(i: int) -> dict:
+        if platforms is None:
+            return _get_STAC_of(items[i])
+        if platforms[i] is None:
+            raise Exception("Sorry, satellite platform not supported!")
+        return _fetch_STAC(platforms[i]["platform"])
+
+    executor = ThreadPoolExecutor(max_workers=maxWorkers)
+    futures = {executor.submit(fetch, i): items[i] for i in range(len(items))}
+    try:
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is None:
+                yield futures[future], future.result(), None
+            else:
+                yield futures[future], None, error
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def getScaleParams(
+    x: Union[ee.Image, ee.ImageCollection], platformDict: Optional[dict] = None
+) -> dict:
     """Gets the scale parameters for each band of the image or image collection.
 
     Args:
         x : Image or image collection to get the scale parameters from.
+        platformDict : Platform of x as returned by _get_platform_STAC(). If None, it is
+            resolved from x.
 
     Returns:
         Dictionary with the scale parameters for each band.
@@ -57,22 +161,26 @@ def getScaleParams(x: Union[ee.Image, ee.ImageCollection]) -> dict:
         >>> S2 = ee.ImageCollection("COPERNICUS/S2_SR")
         >>> getScaleParams(S2)
     """
-    platformDict = _get_platform_STAC(x)
-    eeDict = _load_JSON("ee-catalog-scale.json")
-    platforms = list(eeDict.keys())
+    if platformDict is None:
+        platformDict = _get_platform_STAC(x)
+    params = _load_record("ee-catalog-scale.json", platformDict["platform"])
 
-    if platformDict["platform"] not in platforms:
+    if params is None:
         warnings.warn("This platform is not supported for getting scale parameters.")
         return None
     else:
-        return eeDict[platformDict["platform"]]
+        return _thaw(params)
 
 
-def getOffsetParams(x: Union[ee.Image, ee.ImageCollection]) -> dict:
+def getOffsetParams(
+    x: Union[ee.Image, ee.ImageCollection], platformDict: Optional[dict] = None
+) -> dict:
     """Gets the offset parameters for each band of the image or image collection.
 
     Args:
         x : Image or image collection to get the offset parameters from.
+        platformDict : Platform of x as returned by _get_platform_STAC(). If None, it is
+            resolved from x.
 
     Returns:
         Dictionary with the offset parameters for each band.
@@ -84,24 +192,36 @@ def getOffsetParams(x: Union[ee.Image, ee.ImageCollection]) -> dict:
         >>> S2 = ee.ImageCollection("COPERNICUS/S2_SR")
         >>> getOffsetParams(S2)
     """
-    platformDict = _get_platform_STAC(x)
-    eeDict = _load_JSON("ee-catalog-offset.json")
-    platforms = list(eeDict.keys())
+    if platformDict is None:
+        platformDict = _get_platform_STAC(x)
+    params = _load_record("ee-catalog-offset.json", platformDict["platform"])
 
-    if platformDict["platform"] not in platforms:
+    if params is None:
         warnings.warn("This platform is not supported for getting offset parameters.")
         return None
     else:
-        return eeDict[platformDict["platform"]]
+        return _thaw(params)
 
 
 def scaleAndOffset(
-    x: Union[ee.Image, ee.ImageCollection]
+    x: Union[ee.Image, ee.ImageCollection], platformDict: Optional[dict] = None
 ) -> Union[ee.Image, ee.ImageCollection]:
     """Scales and offsets bands on an Image or Image Collection.
 
+    Only the bands with scale and offset parameters in the catalog are kept, also when
+    all of them have a scale of 1 and an offset of 0. Bands whose scale is 1 and offset
+    is 0 are kept as they are and the offset is skipped when all the offsets are 0, so
+    when no band needs to be changed the bands are only selected.
+
+    When the bands of x were selected by name (see _infer_band_names()), the scale and
+    offset constants are built once for those bands and each image only gets a
+    multiply-add. Otherwise the bands are matched server-side for each image. Both
+    ways keep the same bands.
+
     Args:
         x : Image or Image Collection to scale.
+        platformDict : Platform of x as returned by _get_platform_STAC(). If None, it is
+            resolved from x.
 
     Returns:
         Scaled image or image collection.
@@ -113,24 +233,81 @@ def scaleAndOffset(
         >>> S2 = ee.ImageCollection("COPERNICUS/S2_SR")
         >>> scaleAndOffset(S2)
     """
-    scaleParams = getScaleParams(x)
-    offsetParams = getOffsetParams(x)
+    if platformDict is None:
+        platformDict = _get_platform_STAC(x)
+
+    scaleParams = getScaleParams(x, platformDict)
+    offsetParams = getOffsetParams(x, platformDict)
 
     if scaleParams is None or offsetParams is None:
         warnings.warn("This platform is not supported for scaling and offsetting.")
         return x
     else:
-        scaleParams = ee.Dictionary(scaleParams).toImage()
-        offsetParams = ee.Dictionary(offsetParams).toImage()
+        nonIdentity = {
+            band: scale
+            for band, scale in scaleParams.items()
+            if scale != 1 or offsetParams.get(band, 0) != 0
+        }
+
+        offset = any(offsetParams.get(band, 0) != 0 for band in nonIdentity)
+        bands = _infer_band_names(x)
+
+        if bands is not None:
+            kept = [band for band in bands if band in scaleParams]
+            changed = [band for band in kept if band in nonIdentity]
+
+            if not changed:
+                return x.select(kept)
+
+            # The constants are in the order of the selected bands, so they apply
+            # band by band.
+            scaleImage = ee.Image.constant([scaleParams[band] for band in changed])
+            scaleImage = scaleImage.rename(changed)
+            offsetImage = ee.Image.constant(
+                [offsetParams.get(band, 0) for band in changed]
+            ).rename(changed)
+
+            def scaleOffsetKnown(img):
+                scaledImg = img.select(changed).multiply(scaleImage)
+                if offset:
+                    scaledImg = scaledImg.add(offsetImage)
+                # The image keeps its properties and, once reselected, its band order.
+                return img.addBands(scaledImg, None, True).select(kept)
+
+            if isinstance(x, ee.image.Image):
+                return scaleOffsetKnown(x)
+            elif isinstance(x, ee.imagecollection.ImageCollection):
+                return x.map(scaleOffsetKnown)
+
+        scaleList = ee.List(list(scaleParams))
+
+        def selectCatalogBands(img):
+            bands = img.bandNames().filter(ee.Filter.inList("item", scaleList))
+            return img.select(bands)
+
+        if not nonIdentity:
+            if isinstance(x, ee.image.Image):
+                return selectCatalogBands(x)
+            elif isinstance(x, ee.imagecollection.ImageCollection):
+                return x.map(selectCatalogBands)
+
+        scaledList = ee.List(list(nonIdentity))
+        scaleImage = ee.Dictionary(nonIdentity).toImage()
+        offsetImage = ee.Dictionary(
+            {band: offsetParams.get(band, 0) for band in nonIdentity}
+        ).toImage()
 
         def scaleOffset(img):
-            bands = img.bandNames()
-            scaleList = scaleParams.bandNames()
-            bands = bands.filter(ee.Filter.inList("item", scaleList))
-            SOscaleParams = scaleParams.select(bands)
-            SOoffsetParams = offsetParams.select(bands)
-            scaled = img.select(bands).multiply(SOscaleParams).add(SOoffsetParams)
-            return ee.Image(scaled.copyProperties(img, img.propertyNames()))
+            bands = img.bandNames().filter(ee.Filter.inList("item", scaleList))
+            scaledBands = bands.filter(ee.Filter.inList("item", scaledList))
+            kept = img.select(bands)
+            scaledImg = kept.select(scaledBands).multiply(
+                scaleImage.select(scaledBands)
+            )
+            if offset:
+                scaledImg = scaledImg.add(offsetImage.select(scaledBands))
+            scaledImg = kept.addBands(scaledImg, None, True).select(bands)
+            return ee.Image(scaledImg.copyProperties(img, img.propertyNames()))
 
         if isinstance(x, ee.image.Image):
             scaled = scaleOffset(x)
@@ -157,9 +334,8 @@ def getDOI(x: Union[ee.Image, ee.ImageCollection]) -> str:
         >>> getDOI(S2)
     """
     platformDict = _get_platform_STAC(x)
-    eeDict = _load_JSON()
 
-    return eeDict[platformDict["platform"]]["sci:doi"]
+    return _load_record("ee-catalog-ids.json", platformDict["platform"])["sci:doi"]
 
 
 def getCitation(x: Union[ee.Image, ee.ImageCollection]) -> str:
@@ -179,9 +355,119 @@ def getCitation(x: Union[ee.Image, ee.ImageCollection]) -> str:
         >>> getCitation(S2)
     """
     platformDict = _get_platform_STAC(x)
-    eeDict = _load_JSON()
 
-    return eeDict[platformDict["platform"]]["sci:citation"]
+    return _load_record("ee-catalog-ids.json", platformDict["platform"])["sci:citation"]
+
+
+def _get_records_batch(
+    x: List[Union[str, ee.Image, ee.ImageCollection]], filename: str
+) -> dict:
+    """Gets the records of a data file for the platforms of many objects at once.
+
+    Args:
+        x : List of dataset IDs, asset IDs, images or image collections.
+        filename : JSON filename of the records.
+
+    Returns:
+        Dictionary with the record of each platform (None if it has no record).
+    """
+    platforms = dict.fromkeys(
+        platformDict["platform"] for platformDict in _get_platforms_STAC(x)
+    )
+
+    return {platform: _load_record(filename, platform) for platform in platforms}
+
+
+def getDOIBatch(x: List[Union[str, ee.Image, ee.ImageCollection]]) -> dict:
+    """Gets the DOIs of the platforms of many images or image collections at once.
+
+    Platforms are resolved client-side when possible, and with a single request to the
+    server for all the others.
+
+    Args:
+        x : List of dataset IDs, asset IDs, images or image collections.
+
+    Returns:
+        Dictionary with the DOI of each platform.
+
+    Examples:
+        >>> import ee
+        >>> from ee_extra.STAC.core import getDOIBatch
+        >>> ee.Initialize()
+        >>> getDOIBatch(["COPERNICUS/S2_SR", ee.ImageCollection("MODIS/006/MOD13A2")])
+    """
+    records = _get_records_batch(x, "ee-catalog-ids.json")
+
+    return {platform: record["sci:doi"] for platform, record in records.items()}
+
+
+def getCitationBatch(x: List[Union[str, ee.Image, ee.ImageCollection]]) -> dict:
+    """Gets the citations of the platforms of many images or image collections at once.
+
+    Platforms are resolved client-side when possible, and with a single request to the
+    server for all the others.
+
+    Args:
+        x : List of dataset IDs, asset IDs, images or image collections.
+
+    Returns:
+        Dictionary with the citation of each platform.
+
+    Examples:
+        >>> import ee
+        >>> from ee_extra.STAC.core import getCitationBatch
+        >>> ee.Initialize()
+        >>> getCitationBatch(["COPERNICUS/S2_SR", ee.Image("NASA/NASADEM_HGT/001")])
+    """
+    records = _get_records_batch(x, "ee-catalog-ids.json")
+
+    return {platform: record["sci:citation"] for platform, record in records.items()}
+
+
+def getScaleParamsBatch(x: List[Union[str, ee.Image, ee.ImageCollection]]) -> dict:
+    """Gets the scale parameters of the platforms of many images or image collections
+    at once.
+
+    Platforms are resolved client-side when possible, and with a single request to the
+    server for all the others.
+
+    Args:
+        x : List of dataset IDs, asset IDs, images or image collections.
+
+    Returns:
+        Dictionary with the scale parameters of each platform (None if the platform is
+        not supported for getting scale parameters).
+
+    Examples:
+        >>> from ee_extra.STAC.core import getScaleParamsBatch
+        >>> getScaleParamsBatch(["COPERNICUS/S2_SR", "LANDSAT/LC08/C02/T1_L2"])
+    """
+    records = _get_records_batch(x, "ee-catalog-scale.json")
+
+    return {platform: _thaw(record) for platform, record in records.items()}
+
+
+def getOffsetParamsBatch(x: List[Union[str, ee.Image, ee.ImageCollection]]) -> dict:
+    """Gets the offset parameters of the platforms of many images or image collections
+    at once.
+
+    Platforms are resolved client-side when possible, and with a single request to the
+    server for all the others.
+
+    Args:
+        x : List of dataset IDs, asset IDs, images or image collections.
+
+    Returns:
+        Dictionary with the offset parameters of each platform (None if the platform is
+        not supported for getting offset parameters).
+
+    Examples:
+        >>> from ee_extra.STAC.core import getOffsetParamsBatch
+        >>> getOffsetParamsBatch(["COPERNICUS/S2_SR", "LANDSAT/LC08/C02/T1_L2"])
+    """
+    records = _get_records_batch(x, "ee-catalog-offset.json")
+
+    return {platform: _thaw(record) for platform, record in records.items()}
 
 
 def listDatasets() -> list:
@@ -196,6 +482,35 @@ def listDatasets() -> list:
         >>> ee.Initialize()
         >>> listDatasets()
     """
-    eeDict = _load_JSON()
+    return list(_load_JSON_fields("ee-catalog-ids.json"))
+
+
+def searchDatasets(
+    query: str, n: int = 10, prefix: bool = True, fuzzy: bool = True
+) -> list:
+    """Searches datasets of the GEE STAC by ID, citation and DOI.
+
+    Datasets matching more words of the query rank first. Matches in the dataset ID
+    (including the mission names abbreviated in it, e.g. "Sentinel 2" for
+    "COPERNICUS/S2") rank above matches in the DOI, which rank above matches in the
+    citation. The search index is built once, so queries are fast enough for type-ahead
+    search.
 
-    return list(eeDict.keys())
+    Args:
+        query : Words to search, e.g. "sentinel 2 sr".
+        n : Maximum number of datasets to return.
+        prefix : Whether the last word also matches as a prefix (e.g. "senti" matches
+            "sentinel").
+        fuzzy : Whether words without exact or prefix matches are matched to similar
+            words (e.g. "sentinal" matches "sentinel").
+
+    Returns:
+        List of dataset IDs, best matches first.
+
+    Examples:
+        >>> from ee_extra.STAC.core import searchDatasets
+        >>> searchDatasets("landsat 8 l2", n=3)
+        >>> searchDatasets("sentinal 2", n=3)
+        ['COPERNICUS/S2', 'COPERNICUS/S2_SR', 'COPERNICUS/S2_HARMONIZED']
+    """
+    return _get_search_index().search(query, n, prefix, fuzzy)
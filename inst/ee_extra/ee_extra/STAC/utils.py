@@ -1,53 +1,694 @@
+import bisect
+import collections
+import contextlib
+import functools
+import hashlib
+import heapq
 import json
 import os
 import re
+import threading
+import time
 import warnings
-from typing import Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import ee
-import pkg_resources
 
-from ee_extra.utils import _load_JSON
+from ee_extra.utils import (
+    _CloseMatcher,
+    _get_case_insensitive_close_matches,
+    _get_dataset_records,
+    _load_JSON_fields,
+)
+
+# Algorithms that load an asset, with the name of their ID argument.
+_LOADERS = {"Image.load": "id", "ImageCollection.load": "id"}
+
+# Algorithms whose output keeps the system:id of one of their inputs, with the name of
+# that input. The output of 'Collection.first' is an image of the input collection.
+_PASSTHROUGH = {
+    "Collection.filter": "collection",
+    "Collection.map": "collection",
+    "Collection.limit": "collection",
+    "Collection.first": "collection",
+    "Element.set": "object",
+    "Element.setMulti": "object",
+    "Image.addBands": "dstImg",
+    "Image.clip": "input",
+    "Image.rename": "input",
+    "Image.reproject": "image",
+    "Image.select": "input",
+    "Image.unmask": "input",
+    "Image.updateMask": "image",
+}
+
+
+class _PlatformCache:
+    """Bounded LRU cache of the system:id of ee objects, keyed by a hash of their
+    serialized expression.
+
+    It avoids repeating the system:id getInfo() round trip for expressions whose
+    platform cannot be inferred client-side. The entries are process-wide and
+    thread-safe. The cache can be disabled, and its maxsize and ttl overridden, per
+    thread (see platformCache()).
+
+    Args:
+        maxsize : Maximum number of entries.
+        ttl : Time to live of the entries in seconds. None means no expiration.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._data: "collections.OrderedDict[str, Tuple[float, str]]" = (
+            collections.OrderedDict()
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache is enabled in the current thread."""
+        return getattr(self._local, "disabled", 0) == 0
+
+    @property
+    def maxsize(self) -> int:
+        """Maximum number of entries, as seen by the current thread."""
+        return getattr(self._local, "maxsize", self._maxsize)
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._evict()
+
+    @property
+    def ttl(self) -> Optional[float]:
+        """Time to live of the entries in seconds, as seen by the current thread."""
+        return getattr(self._local, "ttl", self._ttl)
+
+    @ttl.setter
+    def ttl(self, ttl: Optional[float]) -> None:
+        self._ttl = ttl
+
+    @staticmethod
+    def key(args: Union[ee.Image, ee.ImageCollection]) -> str:
+        """Gets the cache key of an ee object.
+
+        Args:
+            args : An Image or Image Collection.
+
+        Returns:
+            Hash of the type and the serialized expression of the object.
+        """
+        serialized = type(args).__name__ + args.serialize()
+        return hashlib.sha1(serialized.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Gets a cached system:id.
+
+        Args:
+            key : Cache key.
+
+        Returns:
+            The cached system:id, or None if it is not cached or has expired.
+        """
+        ttl = self.ttl
+        with self._lock:
+            if key not in self._data:
+                return None
+            stored, ID = self._data[key]
+            if ttl is not None and time.monotonic() - stored > ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return ID
+
+    def set(self, key: str, ID: str) -> None:
+        """Caches a system:id, evicting the least recently used entries if needed.
+
+        Args:
+            key : Cache key.
+            ID : system:id of the object.
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic(), ID)
+            self._data.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Evicts the least recently used entries beyond the maxsize of the current
+        thread."""
+        maxsize = self.maxsize
+        with self._lock:
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._data.clear()
+
+
+_platform_cache = _PlatformCache()
+
+# Default of the platformCache() arguments that leave a setting unchanged, so that
+# ttl=None (no expiration) can be given explicitly.
+_NOT_GIVEN: Any = object()
+
+
+@contextlib.contextmanager
+def platformCache(
+    enabled: bool = True,
+    clear: bool = False,
+    maxsize: int = _NOT_GIVEN,
+    ttl: Optional[float] = _NOT_GIVEN,
+) -> Iterator[_PlatformCache]:
+    """Context manager to control the cache of platform resolutions.
+
+    The settings only apply to the current thread, and are restored when the block
+    exits. The entries are shared by all threads, so a smaller maxsize evicts the
+    least recently used entries of the cache right away.
+
+    Args:
+        enabled : Whether the cache is used inside the block.
+        clear : Whether to clear the cache when entering the block.
+        maxsize : If given, the maximum number of entries of the cache inside the block.
+        ttl : If given, the time to live of the entries in seconds inside the block.
+            None means no expiration.
+
+    Yields:
+        The platform cache.
+
+    Examples:
+        >>> from ee_extra.STAC.utils import platformCache
+        >>> with platformCache(enabled=False):
+        >>>     maskClouds(S2)
+        >>> with platformCache(clear=True, ttl=3600):
+        >>>     pass
+    """
+    if clear:
+        _platform_cache.clear()
+
+    local = _platform_cache._local
+    overrides = {"maxsize": maxsize, "ttl": ttl}
+    previous = {name: getattr(local, name, _NOT_GIVEN) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            if value is not _NOT_GIVEN:
+                setattr(local, name, value)
+        _platform_cache._evict()
+        local.disabled = getattr(local, "disabled", 0) + (not enabled)
+        try:
+            yield _platform_cache
+        finally:
+            local.disabled -= not enabled
+    finally:
+        for name, value in previous.items():
+            if value is not _NOT_GIVEN:
+                setattr(local, name, value)
+            elif hasattr(local, name):
+                delattr(local, name)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_platform_index() -> Dict[str, str]:
+    """Gets the index of the GEE STAC catalog used to resolve platforms.
+
+    The index is built once per process.
+
+    Returns:
+        Dictionary mapping each dataset ID to its 'gee:type'.
+    """
+    types = _load_JSON_fields("ee-catalog-ids.json", ("gee:type",))
+
+    return {platform: value[0] for platform, value in types.items()}
+
+
+def _resolve_platform(ID: str, image: bool) -> Optional[str]:
+    """Resolves the dataset of the catalog that an asset ID belongs to.
+
+    Images of an image collection are resolved to their parent collection, i.e. the ID
+    without its last component.
+
+    Args:
+        ID : Asset ID (system:id) of the image or image collection.
+        image : Whether the asset is an image.
+
+    Returns:
+        Dataset ID, or None if the asset does not belong to any dataset of the catalog.
+    """
+    index = _get_platform_index()
+
+    if image:
+        parent = ID.rpartition("/")[0]
+        if index.get(parent) == "image_collection":
+            return parent
+        if ID in index and index[ID] != "image_collection":
+            return ID
+    elif ID in index and index[ID] != "image":
+        return ID
+
+    return None
+
+
+class _DatasetSearchIndex:
+    """Inverted index over the IDs, citations and DOIs of the GEE STAC catalog.
+
+    Text is split into lowercase alphanumeric tokens (see tokenize()). Every token maps
+    to the datasets containing it, weighted by the field it was found in, and the sorted
+    vocabulary is used to expand prefixes with a binary search. Mission names that
+    are abbreviated in the IDs (e.g. 'Sentinel 2' in 'COPERNICUS/S2_SR') are indexed
+    with the weight of the ID (see ID_ALIASES).
+
+    Args:
+        catalog : Dictionary of datasets, as in ee-catalog-ids.json.
+    """
+
+    FIELD_WEIGHTS = {"id": 3.0, "sci:doi": 2.0, "sci:citation": 1.0}
+    ID_ALIASES = {
+        "COPERNICUS/S1": "Sentinel 1",
+        "COPERNICUS/S2": "Sentinel 2",
+        "COPERNICUS/S3": "Sentinel 3",
+        "COPERNICUS/S5P": "Sentinel 5P",
+    }
+    NOT_AVAILABLE = {"DOI not available", "Citation not available"}
+    TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+    PART_PATTERN = re.compile(r"[a-z]+|[0-9]+")
+    MAX_EXPANSIONS = 64
+
+    def __init__(self, catalog: Any) -> None:
+        self.datasets = list(catalog.keys())
+        postings: Dict[str, Dict[int, float]] = {}
+        for i, ID in enumerate(self.datasets):
+            aliases = [
+                alias
+                for prefix, alias in self.ID_ALIASES.items()
+                if ID.startswith((prefix + "/", prefix + "_")) or ID == prefix
+            ]
+            fields = {**catalog[ID], "id": " ".join([ID] + aliases)}
+            for field, weight in self.FIELD_WEIGHTS.items():
+                if fields.get(field) in self.NOT_AVAILABLE:
+                    continue
+                for token in self.tokenize(fields.get(field) or "", parts=True):
+                    tokenPostings = postings.setdefault(token, {})
+                    tokenPostings[i] = max(tokenPostings.get(i, 0.0), weight)
+        self.postings = postings
+        self.vocabulary = sorted(postings.keys())
+        self.matcher = _CloseMatcher(self.vocabulary, shortlist=32)
+
+    @classmethod
+    def tokenize(cls, text: str, parts: bool = False) -> List[str]:
+        """Splits a text into lowercase alphanumeric tokens.
+
+        Args:
+            text : Text to split.
+            parts : Whether to also add the letter and digit runs of each token, with
+                leading zeros removed from numbers (e.g. 'LC08' gives 'lc08', 'lc' and
+                '8'), so that 'landsat 8' matches 'LANDSAT/LC08'.
+
+        Returns:
+            List of tokens.
+        """
+        tokens = cls.TOKEN_PATTERN.findall(text.lower())
+        if parts:
+            for token in list(tokens):
+                for part in cls.PART_PATTERN.findall(token):
+                    part = part.lstrip("0") or "0" if part.isdigit() else part
+                    if part != token:
+                        tokens.append(part)
+        return tokens
+
+    def expand(self, token: str, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        """Expands a query token into the tokens of the vocabulary it matches.
+
+        Args:
+            token : Query token.
+            prefix : Whether to match tokens starting with the query token.
+            fuzzy : Whether to match similar tokens when there are no other matches.
+
+        Returns:
+            Dictionary of matching tokens and their match quality: 1 for an exact match,
+            0.5 for a prefix match and the similarity ratio divided by 4 for the most
+            similar tokens (fuzzy match).
+        """
+        matches: Dict[str, float] = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        if prefix:
+            start = bisect.bisect_left(self.vocabulary, token)
+            for candidate in self.vocabulary[start : start + self.MAX_EXPANSIONS]:
+                if not candidate.startswith(token):
+                    break
+                matches.setdefault(candidate, 0.5)
+        if fuzzy and not matches:
+            closest = self.matcher.scores(token, n=3)
+            for candidate, ratio in closest:
+                if ratio == closest[0][1]:
+                    matches[candidate] = ratio / 4
+        return matches
+
+    def search(
+        self, query: str, n: int = 10, prefix: bool = True, fuzzy: bool = True
+    ) -> List[str]:
+        """Searches the datasets matching the tokens of a query.
+
+        Datasets matching more query tokens rank first; ties are broken by the sum of
+        the field weights times the match quality of each token.
+
+        Args:
+            query : Text to search.
+            n : Maximum number of datasets to return.
+            prefix : Whether the last query token also matches as a prefix, as the user
+                may still be typing it.
+            fuzzy : Whether query tokens without exact or prefix matches are matched
+                to similar tokens.
+
+        Returns:
+            Dataset IDs, best matches first.
+        """
+        matched: Dict[int, int] = {}
+        scores: Dict[int, float] = {}
+        tokens = self.tokenize(query)
+        for k, token in enumerate(tokens):
+            tokenScores: Dict[int, float] = {}
+            last = k == len(tokens) - 1
+            for match, quality in self.expand(token, prefix and last, fuzzy).items():
+                for i, weight in self.postings[match].items():
+                    score = weight * quality
+                    if score > tokenScores.get(i, 0.0):
+                        tokenScores[i] = score
+            for i, score in tokenScores.items():
+                matched[i] = matched.get(i, 0) + 1
+                scores[i] = scores.get(i, 0.0) + score
+
+        ranked = heapq.nsmallest(
+            n,
+            scores,
+            key=lambda i: (
+                -matched[i],
+                -scores[i],
+                len(self.datasets[i]),
+                self.datasets[i],
+            ),
+        )
+        return [self.datasets[i] for i in ranked]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_search_index() -> _DatasetSearchIndex:
+    """Gets the search index of the GEE STAC catalog, built once per process.
+
+    Returns:
+        Search index.
+    """
+    return _DatasetSearchIndex(_get_dataset_records())
+
+
+def _get_function_name(func: Any) -> Optional[str]:
+    """Gets the name of the algorithm of a node of the expression graph.
+
+    Args:
+        func : The func attribute of an ee.ComputedObject.
+
+    Returns:
+        Name of the algorithm, or None if it is not a named algorithm.
+    """
+    try:
+        return func.getSignature().get("name")
+    except AttributeError:
+        return None
+
+
+def _get_constant(value: Any) -> Any:
+    """Unwraps a client-side constant that earthengine-api wraps in an ee.List or an
+    ee.String (e.g. the band names of select() or the fields of a filter).
+
+    Args:
+        value : An argument of a node of the expression graph.
+
+    Returns:
+        The list or string, or value itself if it is not a wrapped constant.
+    """
+    if isinstance(value, (ee.List, ee.String)) and value.func is None:
+        # Variables of mapped functions have no constant.
+        attribute = "_list" if isinstance(value, ee.List) else "_string"
+        constant = getattr(value, attribute, None)
+        if constant is not None:
+            return constant
+    return value
+
+
+_SETTERS = {"Element.set", "Element.setMulti"}
+
+
+def _sets_system_id(args: Any) -> bool:
+    """Checks whether an Element.set or Element.setMulti node may set the system:id.
+
+    Args:
+        args : An ee.ComputedObject calling Element.set or Element.setMulti.
+
+    Returns:
+        Whether the system:id is set, or the properties are not known client-side.
+    """
+    setArgs = args.args or {}
+    if "key" in setArgs:
+        key = _get_constant(setArgs["key"])
+        return not isinstance(key, str) or key == "system:id"
+    properties = setArgs.get("properties")
+    if isinstance(properties, ee.Dictionary) and properties.func is None:
+        properties = getattr(properties, "_dictionary", None)
+    return not isinstance(properties, dict) or "system:id" in properties
+
+
+def _infer_asset_id(args: Any) -> Optional[Tuple[str, bool]]:
+    """Recovers the asset ID an object was loaded from by walking its client-side
+    expression graph, without contacting the server.
+
+    The graph is followed through algorithms that keep the system:id of their input
+    (filters, maps, band selections, ...) down to an ee.Image() or ee.ImageCollection()
+    constructor called with a string ID. Setting the system:id property stops the walk.
+
+    Args:
+        args : An Image or Image Collection.
+
+    Returns:
+        Tuple with the asset ID and whether it is the ID of a collection the object
+        belongs to, or None if the ID cannot be inferred client-side.
+    """
+    collection = False
+
+    while isinstance(args, ee.computedobject.ComputedObject):
+        name = _get_function_name(args.func)
+        if name in _LOADERS:
+            ID = (args.args or {}).get(_LOADERS[name])
+            if not isinstance(ID, str):
+                return None
+            return ID, collection or name == "ImageCollection.load"
+        if name not in _PASSTHROUGH:
+            return None
+        if name in _SETTERS and _sets_system_id(args):
+            return None
+        if name == "Collection.first":
+            collection = True
+        args = (args.args or {}).get(_PASSTHROUGH[name])
+
+    return None
+
+
+# Algorithms whose output has the same bands as one of their inputs, with the name of
+# that input.
+_SAME_BANDS = {
+    "Collection.filter": "collection",
+    "Collection.limit": "collection",
+    "Collection.first": "collection",
+    "Element.set": "object",
+    "Element.setMulti": "object",
+    "Image.clip": "input",
+    "Image.reproject": "image",
+    "Image.unmask": "input",
+    "Image.updateMask": "image",
+}
+
+
+def _get_selected_bands(select: Any) -> Optional[List[str]]:
+    """Gets the band names selected by an Image.select node of the expression graph.
+
+    Args:
+        select : An ee.ComputedObject calling Image.select.
+
+    Returns:
+        List of band names, or None if they are not plain names given client-side.
+    """
+    selectArgs = select.args or {}
+    selectors = _get_constant(selectArgs.get("bandSelectors"))
+    # Band selectors are regular expressions: only plain names are resolved.
+    if (
+        selectArgs.get("newNames") is not None
+        or not isinstance(selectors, (list, tuple))
+        or not all(
+            isinstance(band, str) and re.fullmatch(r"\w+", band) for band in selectors
+        )
+    ):
+        return None
+    return list(selectors)
+
+
+def _get_mapped_select(args: Any) -> Optional[Any]:
+    """Gets the Image.select node that a Collection.map node applies to each image, as
+    built by ee.ImageCollection.select().
+
+    Args:
+        args : An ee.ComputedObject calling Collection.map.
+
+    Returns:
+        The Image.select node, or None if the mapped function does something else.
+    """
+    function = (args.args or {}).get("baseAlgorithm")
+    if not isinstance(function, ee.customfunction.CustomFunction):
+        return None
+    body = function._body
+    if not isinstance(body, ee.computedobject.ComputedObject) or (
+        _get_function_name(body.func) != "Image.select"
+    ):
+        return None
+    variable = (body.args or {}).get("input")
+    parameters = function.getSignature()["args"]
+    # The bands must be selected from the mapped image itself.
+    if (
+        len(parameters) != 1
+        or not isinstance(variable, ee.computedobject.ComputedObject)
+        or not variable.isVariable()
+        or variable.varName != parameters[0]["name"]
+    ):
+        return None
+    return body
+
+
+def _infer_band_names(args: Any) -> Optional[List[str]]:
+    """Recovers the band names of an image (or of the images of a collection) by
+    walking its client-side expression graph, without contacting the server.
+
+    The graph is followed through algorithms that keep the bands of their input down
+    to a selection of bands by their names, of an image or of each image of a
+    collection. The bands of an asset are not assumed, since images of the same
+    collection may lack some bands or have extra ones.
+
+    Args:
+        args : An Image or Image Collection.
+
+    Returns:
+        List of band names, or None if they cannot be inferred client-side.
+    """
+    while isinstance(args, ee.computedobject.ComputedObject):
+        name = _get_function_name(args.func)
+        if name == "Image.select":
+            return _get_selected_bands(args)
+        if name == "Collection.map":
+            select = _get_mapped_select(args)
+            return None if select is None else _get_selected_bands(select)
+        if name not in _SAME_BANDS:
+            return None
+        args = (args.args or {}).get(_SAME_BANDS[name])
+
+    return None
 
 
 def _get_platform_STAC(args: Union[ee.Image, ee.ImageCollection]) -> dict:
     """Gets the platform (satellite) of an image (or image collection) and wheter if it is a Surface Reflectance product.
 
+    The platform is inferred from the client-side expression graph when possible (see
+    _infer_asset_id()). The system:id is only requested from the server otherwise.
+
     Args:
         args : An Image or Image Collection to get the platform from.
 
     Returns:
         Platform and product of the Image (or Image Collection).
     """
-    eeDict = _load_JSON()
-    platforms = list(eeDict.keys())
-
-    ID = args.get("system:id").getInfo()
-
     plt = None
 
-    for platform in platforms:
+    inferred = _infer_asset_id(args)
+    if inferred is not None:
+        ID, collection = inferred
+        plt = _resolve_platform(ID, not collection)
 
-        if eeDict[platform]["gee:type"] == "image_collection" and isinstance(
-            args, ee.image.Image
-        ):
-            pltID = "/".join(ID.split("/")[:-1])
-        elif eeDict[platform]["gee:type"] == "image" and isinstance(
-            args, ee.imagecollection.ImageCollection
-        ):
-            pass
+    if plt is None:
+        if _platform_cache.enabled:
+            key = _platform_cache.key(args)
+            ID = _platform_cache.get(key)
+            if ID is None:
+                ID = args.get("system:id").getInfo()
+                _platform_cache.set(key, ID)
         else:
-            pltID = ID
+            ID = args.get("system:id").getInfo()
+        plt = _resolve_platform(ID, isinstance(args, ee.image.Image))
 
-        if platform == pltID:
-            plt = pltID
+    if plt is None:
+        close_matches = _get_case_insensitive_close_matches(
+            ID, tuple(_get_platform_index()), n=3
+        )
+        hint = " Close matches: {}.".format(close_matches) if close_matches else ""
+        raise Exception("Sorry, satellite platform not supported!{}".format(hint))
 
-        if "_SR" in pltID:
-            platformDict = {"platform": plt, "sr": True}
-        else:
-            platformDict = {"platform": plt, "sr": False}
+    return {"platform": plt, "sr": "_SR" in plt}
 
-    if plt is None:
-        raise Exception("Sorry, satellite platform not supported!")
 
-    return platformDict
+def _get_platforms_STAC(
+    args: List[Union[str, ee.Image, ee.ImageCollection]], strict: bool = True
+) -> List[Optional[dict]]:
+    """Gets the platforms of many images, image collections or asset IDs at once.
+
+    Asset IDs and objects whose platform can be inferred client-side (see
+    _infer_asset_id()) or is in the platform cache are resolved without contacting the
+    server. The system:id of all the remaining objects is requested in a single
+    getInfo() call.
+
+    Args:
+        args : List of asset IDs, Images or Image Collections.
+        strict : Whether to raise an exception if any platform is not supported. If
+            False, unsupported platforms are returned as None.
+
+    Returns:
+        Platform and product of each element, in the same order as args.
+    """
+    IDs: List[Optional[str]] = [None] * len(args)
+    platforms: List[Optional[str]] = [None] * len(args)
+    pending = []
+
+    for i, arg in enumerate(args):
+        if isinstance(arg, str):
+            IDs[i] = arg
+            platforms[i] = _resolve_platform(arg, False) or _resolve_platform(arg, True)
+            continue
+        inferred = _infer_asset_id(arg)
+        if inferred is not None:
+            ID, collection = inferred
+            platforms[i] = _resolve_platform(ID, not collection)
+            if platforms[i] is not None:
+                continue
+        if _platform_cache.enabled:
+            IDs[i] = _platform_cache.get(_platform_cache.key(arg))
+        if IDs[i] is None:
+            pending.append(i)
+
+    if pending:
+        fetched = ee.List([args[i].get("system:id") for i in pending]).getInfo()
+        for i, ID in zip(pending, fetched):
+            IDs[i] = ID
+            if _platform_cache.enabled and ID is not None:
+                _platform_cache.set(_platform_cache.key(args[i]), ID)
+
+    for i, arg in enumerate(args):
+        if platforms[i] is None and IDs[i] is not None and not isinstance(arg, str):
+            platforms[i] = _resolve_platform(IDs[i], isinstance(arg, ee.image.Image))
+
+    unsupported = [IDs[i] for i, plt in enumerate(platforms) if plt is None]
+    if unsupported and strict:
+        raise Exception(
+            "Sorry, satellite platform not supported: {}".format(unsupported)
+        )
+
+    return [
+        None if plt is None else {"platform": plt, "sr": "_SR" in plt}
+        for plt in platforms
+    ]
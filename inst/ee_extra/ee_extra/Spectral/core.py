@@ -8,13 +8,19 @@ import ee
 
 from ee_extra.Spectral.utils import (
     _get_expression_map,
+    _get_index_names,
     _get_indices,
+    _get_indices_of_domain,
+    _get_indices_subset,
     _get_kernel_image,
     _get_kernel_parameters,
+    _get_raw_formula,
     _get_tc_coefficients,
     _remove_none_dict,
     _match_histogram,
 )
+from ee_extra.utils import _get_case_insensitive_close_matches, _thaw
+from ee_extra.STAC.core import getOffsetParams, getScaleParams
 from ee_extra.STAC.utils import _get_platform_STAC
 
 
@@ -44,12 +50,14 @@ def spectralIndices(
     lambdaG: Union[float, int] = 555.0,
     online: bool = False,
     drop: bool = False,
+    scaled: bool = True,
 ) -> Union[ee.Image, ee.ImageCollection]:
     """Computes one or more spectral indices (indices are added as bands) for an image or
     image collection.
 
     Args:
-        x : Image or Image Collectionto compute indices on. Must be scaled to [0,1].
+        x : Image or Image Collectionto compute indices on. Must be scaled to [0,1],
+            unless scaled = False.
         index : Index or list of indices to compute.
         G : Gain factor. Used just for index = 'EVI'.
         C1 : Coefficient 1 for the aerosol resistance term. Used just for index = 'EVI'.
@@ -80,6 +88,11 @@ def spectralIndices(
         lambdaR : Red wavelength used for NIRvH2 and NDGI.
         lambdaG: Green wavelength used for NDGI.
         drop : Whether to drop all bands except the new spectral indices.
+        scaled : Whether x is already scaled to [0,1]. If False, x has the raw values of
+            the platform and the scale and offset of the catalog are folded into the
+            formula of each index, only for the bands it uses, instead of running
+            scaleAndOffset() beforehand. Indices that do not change with the scale of
+            the bands (e.g. NDVI on Sentinel-2) are computed on the raw bands directly.
 
     Returns:
         Image or Image Collection with the computed spectral index, or indices, as new
@@ -125,11 +138,9 @@ def spectralIndices(
         "lambdaG": float(lambdaG),
     }
 
-    spectralIndices = _get_indices(online)
-    indicesNames = list(spectralIndices.keys())
-
     if not isinstance(index, list):
         if index == "all":
+            spectralIndices = _get_indices(online)
             index = list(spectralIndices.keys())
         elif index in [
             "vegetation",
@@ -141,35 +152,66 @@ def spectralIndices(
             "kernel",
             "radar",
         ]:
-            temporalListOfIndices = []
-            for idx in indicesNames:
-                if spectralIndices[idx]["application_domain"] == index:
-                    temporalListOfIndices.append(idx)
-            index = temporalListOfIndices
+            spectralIndices = _get_indices_of_domain(index, online)
+            index = list(spectralIndices.keys())
         else:
             index = [index]
+            spectralIndices = _get_indices_subset(index, online)
+    else:
+        spectralIndices = _get_indices_subset(index, online)
+
+    if not scaled:
+        scaleParams = getScaleParams(x, platformDict)
+        offsetParams = getOffsetParams(x, platformDict)
+        if scaleParams is None or offsetParams is None:
+            raise Exception(
+                "Sorry, satellite platform not supported for raw values! Use scaled = True."
+            )
 
     for idx in index:
         if idx not in list(spectralIndices.keys()):
+            close_matches = _get_case_insensitive_close_matches(
+                idx, _get_index_names(online), n=3
+            )
+            hint = f" Close matches: {close_matches}." if close_matches else ""
             warnings.warn(
-                f"Index {idx} is not a built-in index and it won't be computed!"
+                f"Index {idx} is not a built-in index and it won't be computed!{hint}"
             )
         else:
+            formula = spectralIndices[idx]["formula"]
+            rawVariables = {}
+            if not scaled:
+                formula, rawVariables = _get_raw_formula(
+                    formula,
+                    platformDict,
+                    scaleParams,
+                    offsetParams,
+                    additionalParameters,
+                )
 
             def temporalIndex(img):
-                lookupDic = _get_expression_map(img, platformDict)
+                lookupDic = _get_expression_map(img, platformDict, raw=not scaled)
                 lookupDic = {**lookupDic, **additionalParameters}
                 kernelParameters = _get_kernel_parameters(img, lookupDic, kernel, sigma)
-                lookupDic = {**lookupDic, **kernelParameters}
+                if not scaled and any(
+                    band in kernelParameters for band in spectralIndices[idx]["bands"]
+                ):
+                    # Kernels are not linear, so they are computed on scaled bands.
+                    scaledLookup = _get_expression_map(
+                        img, platformDict, scaleParams, offsetParams
+                    )
+                    scaledLookup = {**scaledLookup, **additionalParameters}
+                    kernelParameters = _get_kernel_parameters(
+                        img, scaledLookup, kernel, sigma
+                    )
+                lookupDic = {**lookupDic, **kernelParameters, **rawVariables}
                 lookupDicCurated = _remove_none_dict(lookupDic)
                 if all(
                     band in list(lookupDicCurated.keys())
                     for band in spectralIndices[idx]["bands"]
                 ):
                     return img.addBands(
-                        img.expression(
-                            spectralIndices[idx]["formula"], lookupDicCurated
-                        ).rename(idx)
+                        img.expression(formula, lookupDicCurated).rename(idx)
                     )
                 else:
                     warnings.warn(
@@ -209,7 +251,7 @@ def indices(online: bool = False) -> dict:
         >>> ind.BAIS2.reference
         'https://doi.org/10.3390/ecrs-2-05177'
     """
-    return _get_indices(online)
+    return _thaw(_get_indices(online))
 
 
 def listIndices(online: bool = False) -> list:
@@ -228,7 +270,7 @@ def listIndices(online: bool = False) -> list:
         >>> listIndices()
         ['BNDVI','CIG','CVI','EVI','EVI2','GBNDVI','GNDVI',...]
     """
-    return list(_get_indices(online).keys())
+    return _get_index_names(online)
 
 
 def tasseledCap(
@@ -1,235 +1,398 @@
-import json
+import ast
+import operator
 import os
+import random
 import re
-import urllib.request
+import sys
 import warnings
-from typing import Optional, Union, Tuple, Dict
+from typing import Optional, Union, Tuple, Dict, List
 
 import ee
-import pkg_resources
 
 from ee_extra.STAC.utils import _get_platform_STAC
-from ee_extra.utils import _load_JSON
+from ee_extra.utils import (
+    _get_index_records,
+    _load_JSON_fields,
+    _load_online_JSON,
+    _load_record,
+)
+
+
+# Variables of the spectral index formulas for each platform: the band each variable
+# refers to, or the default value of the wavelength parameters.
+_PALSAR = {"HH": "HH", "HV": "HV"}
+
+_S1 = {"HH": "HH", "HV": "HV", "VV": "VV", "VH": "VH"}
+
+_S2 = {
+    "A": "B1",
+    "B": "B2",
+    "G": "B3",
+    "R": "B4",
+    "RE1": "B5",
+    "RE2": "B6",
+    "RE3": "B7",
+    "N": "B8",
+    "N2": "B8A",
+    "WV": "B9",
+    "S1": "B11",
+    "S2": "B12",
+    "lambdaG": 559.8,
+    "lambdaR": 664.6,
+    "lambdaN": 832.8,
+}
+
+_L8 = {
+    "A": "B1",
+    "B": "B2",
+    "G": "B3",
+    "R": "B4",
+    "N": "B5",
+    "S1": "B6",
+    "S2": "B7",
+    "T1": "B10",
+    "T2": "B11",
+    "lambdaG": 560.0,
+    "lambdaR": 655.0,
+    "lambdaN": 865.0,
+}
+
+_L8C2 = {
+    "A": "SR_B1",
+    "B": "SR_B2",
+    "G": "SR_B3",
+    "R": "SR_B4",
+    "N": "SR_B5",
+    "S1": "SR_B6",
+    "S2": "SR_B7",
+    "T1": "ST_B10",
+    "lambdaG": 560.0,
+    "lambdaR": 655.0,
+    "lambdaN": 865.0,
+}
+
+_L45 = {
+    "B": "B1",
+    "G": "B2",
+    "R": "B3",
+    "N": "B4",
+    "S1": "B5",
+    "T1": "B6",
+    "S2": "B7",
+    "lambdaG": 560.0,
+    "lambdaR": 660.0,
+    "lambdaN": 830.0,
+}
+
+_L45C2 = {
+    "B": "SR_B1",
+    "G": "SR_B2",
+    "R": "SR_B3",
+    "N": "SR_B4",
+    "S1": "SR_B5",
+    "T1": "ST_B6",
+    "S2": "SR_B7",
+    "lambdaG": 560.0,
+    "lambdaR": 660.0,
+    "lambdaN": 830.0,
+}
+
+_L7 = {**_L45, "lambdaN": 835.0}
+
+_L7C2 = {**_L45C2, "lambdaN": 835.0}
+
+_MOD09GQ = {
+    "R": "sur_refl_b01",
+    "N": "sur_refl_b02",
+    "lambdaR": 645.0,
+    "lambdaN": 858.5,
+}
+
+_MOD09GA = {
+    "B": "sur_refl_b03",
+    "G": "sur_refl_b04",
+    "R": "sur_refl_b01",
+    "N": "sur_refl_b02",
+    "S1": "sur_refl_b06",
+    "S2": "sur_refl_b07",
+    "lambdaG": 555.0,
+    "lambdaR": 645.0,
+    "lambdaN": 858.5,
+}
+
+_MCD43A4 = {
+    "B": "Nadir_Reflectance_Band3",
+    "G": "Nadir_Reflectance_Band4",
+    "R": "Nadir_Reflectance_Band1",
+    "N": "Nadir_Reflectance_Band2",
+    "S1": "Nadir_Reflectance_Band6",
+    "S2": "Nadir_Reflectance_Band7",
+    "lambdaG": 555.0,
+    "lambdaR": 645.0,
+    "lambdaN": 858.5,
+}
+
+_EXPRESSION_TABLES = {
+    "JAXA/ALOS/PALSAR-2/Level2_2/ScanSAR": _PALSAR,
+    "COPERNICUS/S1_GRD": _S1,
+    "COPERNICUS/S2": _S2,
+    "COPERNICUS/S2_HARMONIZED": _S2,
+    "COPERNICUS/S2_SR": _S2,
+    "COPERNICUS/S2_SR_HARMONIZED": _S2,
+    "LANDSAT/LC08/C01/T1_SR": _L8,
+    "LANDSAT/LC08/C01/T2_SR": _L8,
+    "LANDSAT/LC08/C02/T1_L2": _L8C2,
+    "LANDSAT/LC08/C02/T2_L2": _L8C2,
+    "LANDSAT/LC09/C02/T1_L2": _L8C2,
+    "LANDSAT/LC09/C02/T2_L2": _L8C2,
+    "LANDSAT/LE07/C01/T1_SR": _L7,
+    "LANDSAT/LE07/C01/T2_SR": _L7,
+    "LANDSAT/LE07/C02/T1_L2": _L7C2,
+    "LANDSAT/LE07/C02/T2_L2": _L7C2,
+    "LANDSAT/LT05/C01/T1_SR": _L45,
+    "LANDSAT/LT05/C01/T2_SR": _L45,
+    "LANDSAT/LT05/C02/T1_L2": _L45C2,
+    "LANDSAT/LT05/C02/T2_L2": _L45C2,
+    "LANDSAT/LT04/C01/T1_SR": _L45,
+    "LANDSAT/LT04/C01/T2_SR": _L45,
+    "LANDSAT/LT04/C02/T1_L2": _L45C2,
+    "LANDSAT/LT04/C02/T2_L2": _L45C2,
+    "MODIS/006/MOD09GQ": _MOD09GQ,
+    "MODIS/006/MYD09GQ": _MOD09GQ,
+    "MODIS/006/MOD09GA": _MOD09GA,
+    "MODIS/006/MYD09GA": _MOD09GA,
+    "MODIS/006/MOD09Q1": _MOD09GQ,
+    "MODIS/006/MYD09Q1": _MOD09GQ,
+    "MODIS/006/MOD09A1": _MOD09GA,
+    "MODIS/006/MYD09A1": _MOD09GA,
+    "MODIS/006/MCD43A4": _MCD43A4,
+    "MODIS/061/MOD09GQ": _MOD09GQ,
+    "MODIS/061/MYD09GQ": _MOD09GQ,
+    "MODIS/061/MOD09GA": _MOD09GA,
+    "MODIS/061/MYD09GA": _MOD09GA,
+    "MODIS/061/MOD09Q1": _MOD09GQ,
+    "MODIS/061/MYD09Q1": _MOD09GQ,
+    "MODIS/061/MOD09A1": _MOD09GA,
+    "MODIS/061/MYD09A1": _MOD09GA,
+    "MODIS/061/MCD43A4": _MCD43A4,
+}
+
+
+def _get_expression_table(platformDict: dict) -> dict:
+    """Gets the variables of the spectral index formulas for a platform.
+
+    Args:
+        platformDict : Dictionary retrieved from the _get_STAC_platform() method.
+
+    Returns:
+        Dictionary with the band name (str) or the value (float) of each variable.
+    """
+    plat = platformDict["platform"]
+
+    if plat not in _EXPRESSION_TABLES:
+        raise Exception(
+            f"Sorry, satellite platform {plat} not supported for spectral index computation!"
+        )
+
+    return _EXPRESSION_TABLES[plat]
 
 
-def _get_expression_map(img: ee.Image, platformDict: dict) -> dict:
+def _get_expression_map(
+    img: ee.Image,
+    platformDict: dict,
+    scaleParams: Optional[dict] = None,
+    offsetParams: Optional[dict] = None,
+    raw: bool = False,
+) -> dict:
     """Gets the dictionary required for the map parameter i n ee.Image.expression() method.
 
     Args:
         img : Image to get the dictionary from.
         platformDict : Dictionary retrieved from the _get_STAC_platform() method.
+        scaleParams : Scale parameters of the bands. If given, the bands are scaled and
+            offset (with offsetParams) before being used.
+        offsetParams : Offset parameters of the bands.
+        raw : Whether img has the raw values of the platform. Raw bands are cast to
+            float, so divisions of integer bands are not truncated.
 
     Returns:
         Map dictionary for the ee.Image.expression() method.
     """
+    lookup = {}
 
-    def lookupPALSAR(img):
-        return {
-            "HH": img.select("HH"),
-            "HV": img.select("HV"),
-        }
+    for key, value in _get_expression_table(platformDict).items():
+        if isinstance(value, str):
+            band = value
+            value = img.select(band)
+            if raw:
+                value = value.toFloat()
+            if scaleParams is not None:
+                value = value.multiply(scaleParams.get(band, 1)).add(
+                    offsetParams.get(band, 0)
+                )
+        lookup[key] = value
 
-    def lookupS1(img):
-        return {
-            "HH": img.select("HH"),
-            "HV": img.select("HV"),
-            "VV": img.select("VV"),
-            "VH": img.select("VH"),
-        }
+    return lookup
 
-    def lookupS2(img):
-        return {
-            "A": img.select("B1"),
-            "B": img.select("B2"),
-            "G": img.select("B3"),
-            "R": img.select("B4"),
-            "RE1": img.select("B5"),
-            "RE2": img.select("B6"),
-            "RE3": img.select("B7"),
-            "N": img.select("B8"),
-            "N2": img.select("B8A"),
-            "WV": img.select("B9"),
-            "S1": img.select("B11"),
-            "S2": img.select("B12"),
-            "lambdaG": 559.8,
-            "lambdaR": 664.6,
-            "lambdaN": 832.8,
-        }
 
-    def lookupL8(img):
-        return {
-            "A": img.select("B1"),
-            "B": img.select("B2"),
-            "G": img.select("B3"),
-            "R": img.select("B4"),
-            "N": img.select("B5"),
-            "S1": img.select("B6"),
-            "S2": img.select("B7"),
-            "T1": img.select("B10"),
-            "T2": img.select("B11"),
-            "lambdaG": 560.0,
-            "lambdaR": 655.0,
-            "lambdaN": 865.0,
-        }
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
 
-    def lookupL8C2(img):
-        return {
-            "A": img.select("SR_B1"),
-            "B": img.select("SR_B2"),
-            "G": img.select("SR_B3"),
-            "R": img.select("SR_B4"),
-            "N": img.select("SR_B5"),
-            "S1": img.select("SR_B6"),
-            "S2": img.select("SR_B7"),
-            "T1": img.select("ST_B10"),
-            "lambdaG": 560.0,
-            "lambdaR": 655.0,
-            "lambdaN": 865.0,
-        }
 
-    def lookupL45(img):
-        return {
-            "B": img.select("B1"),
-            "G": img.select("B2"),
-            "R": img.select("B3"),
-            "N": img.select("B4"),
-            "S1": img.select("B5"),
-            "T1": img.select("B6"),
-            "S2": img.select("B7"),
-            "lambdaG": 560.0,
-            "lambdaR": 660.0,
-            "lambdaN": 830.0,
-        }
+def _evaluate_formula(formula: str, variables: Dict[str, float]) -> float:
+    """Evaluates an arithmetic spectral index formula client-side.
 
-    def lookupL45C2(img):
-        return {
-            "B": img.select("SR_B1"),
-            "G": img.select("SR_B2"),
-            "R": img.select("SR_B3"),
-            "N": img.select("SR_B4"),
-            "S1": img.select("SR_B5"),
-            "T1": img.select("ST_B6"),
-            "S2": img.select("SR_B7"),
-            "lambdaG": 560.0,
-            "lambdaR": 660.0,
-            "lambdaN": 830.0,
-        }
+    Only numbers, variables and the +, -, *, / and ** operators are supported.
 
-    def lookupL7(img):
-        return {
-            "B": img.select("B1"),
-            "G": img.select("B2"),
-            "R": img.select("B3"),
-            "N": img.select("B4"),
-            "S1": img.select("B5"),
-            "T1": img.select("B6"),
-            "S2": img.select("B7"),
-            "lambdaG": 560.0,
-            "lambdaR": 660.0,
-            "lambdaN": 835.0,
-        }
+    Args:
+        formula : Formula of the index.
+        variables : Value of each variable.
 
-    def lookupL7C2(img):
-        return {
-            "B": img.select("SR_B1"),
-            "G": img.select("SR_B2"),
-            "R": img.select("SR_B3"),
-            "N": img.select("SR_B4"),
-            "S1": img.select("SR_B5"),
-            "T1": img.select("ST_B6"),
-            "S2": img.select("SR_B7"),
-            "lambdaG": 560.0,
-            "lambdaR": 660.0,
-            "lambdaN": 835.0,
-        }
+    Returns:
+        Value of the formula.
 
-    def lookupMOD09GQ(img):
-        return {
-            "R": img.select("sur_refl_b01"),
-            "N": img.select("sur_refl_b02"),
-            "lambdaR": 645.0,
-            "lambdaN": 858.5,
-        }
+    Raises:
+        ValueError : If the formula has anything else or an unknown variable.
+    """
 
-    def lookupMOD09GA(img):
-        return {
-            "B": img.select("sur_refl_b03"),
-            "G": img.select("sur_refl_b04"),
-            "R": img.select("sur_refl_b01"),
-            "N": img.select("sur_refl_b02"),
-            "S1": img.select("sur_refl_b06"),
-            "S2": img.select("sur_refl_b07"),
-            "lambdaG": 555.0,
-            "lambdaR": 645.0,
-            "lambdaN": 858.5,
-        }
+    def evaluate(node):
+        if isinstance(node, ast.Expression):
+            return evaluate(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        # Python 3.7 parses numbers as ast.Num instead of ast.Constant.
+        if sys.version_info < (3, 8) and isinstance(node, ast.Num):
+            if isinstance(node.n, (int, float)):
+                return node.n
+        if isinstance(node, ast.Name) and node.id in variables:
+            return variables[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            return _OPERATORS[type(node.op)](evaluate(node.left), evaluate(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+            return _OPERATORS[type(node.op)](evaluate(node.operand))
+        raise ValueError("Unsupported formula: {}".format(formula))
+
+    return evaluate(ast.parse(formula, mode="eval"))
+
+
+def _is_scale_invariant(
+    formula: str,
+    bands: Dict[str, str],
+    scaleParams: dict,
+    offsetParams: dict,
+    parameters: dict,
+    samples: int = 8,
+) -> bool:
+    """Checks numerically whether scaling and offsetting the bands of a formula leaves
+    its value unchanged, e.g. a normalized difference of bands sharing their scale.
 
-    def lookupMCD43A4(img):
-        return {
-            "B": img.select("Nadir_Reflectance_Band3"),
-            "G": img.select("Nadir_Reflectance_Band4"),
-            "R": img.select("Nadir_Reflectance_Band1"),
-            "N": img.select("Nadir_Reflectance_Band2"),
-            "S1": img.select("Nadir_Reflectance_Band6"),
-            "S2": img.select("Nadir_Reflectance_Band7"),
-            "lambdaG": 555.0,
-            "lambdaR": 645.0,
-            "lambdaN": 858.5,
+    Args:
+        formula : Formula of the index.
+        bands : Band name of each band variable of the formula.
+        scaleParams : Scale parameters of the bands.
+        offsetParams : Offset parameters of the bands.
+        parameters : Value of each other variable of the formula.
+        samples : Number of random points to check.
+
+    Returns:
+        Whether the formula gives the same value on raw and on scaled bands.
+    """
+    rng = random.Random(0)
+
+    for _ in range(samples):
+        raw = {var: rng.uniform(100.0, 10000.0) for var in bands}
+        scaled = {
+            var: scaleParams.get(band, 1) * raw[var] + offsetParams.get(band, 0)
+            for var, band in bands.items()
         }
+        try:
+            a = _evaluate_formula(formula, {**parameters, **raw})
+            b = _evaluate_formula(formula, {**parameters, **scaled})
+        except (ValueError, ArithmeticError):
+            return False
+        if not abs(a - b) <= 1e-9 * max(abs(a), abs(b), 1e-12):
+            return False
+
+    return True
+
+
+def _get_raw_formula(
+    formula: str,
+    platformDict: dict,
+    scaleParams: dict,
+    offsetParams: dict,
+    parameters: dict,
+) -> Tuple[str, dict]:
+    """Rewrites a formula on scaled bands into a formula on raw bands.
+
+    Each band variable referenced by the formula (e.g. N) is replaced by
+    (N * scale_N + offset_N), leaving out the terms that are 1 or 0. Formulas whose
+    value does not change when the bands are scaled (e.g. normalized differences of
+    bands with the same scale and no offset) are left as they are, and when only the
+    common scale of the bands cancels out, only the offsets are applied.
+
+    Args:
+        formula : Formula of the index.
+        platformDict : Dictionary retrieved from the _get_STAC_platform() method.
+        scaleParams : Scale parameters of the bands.
+        offsetParams : Offset parameters of the bands.
+        parameters : Value of the other variables of the formula.
 
-    lookupPlatform = {
-        "JAXA/ALOS/PALSAR-2/Level2_2/ScanSAR": lookupPALSAR,
-        "COPERNICUS/S1_GRD": lookupS1,
-        "COPERNICUS/S2": lookupS2,
-        "COPERNICUS/S2_HARMONIZED": lookupS2,
-        "COPERNICUS/S2_SR": lookupS2,
-        "COPERNICUS/S2_SR_HARMONIZED": lookupS2,
-        "LANDSAT/LC08/C01/T1_SR": lookupL8,
-        "LANDSAT/LC08/C01/T2_SR": lookupL8,
-        "LANDSAT/LC08/C02/T1_L2": lookupL8C2,
-        "LANDSAT/LC08/C02/T2_L2": lookupL8C2,
-        "LANDSAT/LC09/C02/T1_L2": lookupL8C2,
-        "LANDSAT/LC09/C02/T2_L2": lookupL8C2,
-        "LANDSAT/LE07/C01/T1_SR": lookupL7,
-        "LANDSAT/LE07/C01/T2_SR": lookupL7,
-        "LANDSAT/LE07/C02/T1_L2": lookupL7C2,
-        "LANDSAT/LE07/C02/T2_L2": lookupL7C2,
-        "LANDSAT/LT05/C01/T1_SR": lookupL45,
-        "LANDSAT/LT05/C01/T2_SR": lookupL45,
-        "LANDSAT/LT05/C02/T1_L2": lookupL45C2,
-        "LANDSAT/LT05/C02/T2_L2": lookupL45C2,
-        "LANDSAT/LT04/C01/T1_SR": lookupL45,
-        "LANDSAT/LT04/C01/T2_SR": lookupL45,
-        "LANDSAT/LT04/C02/T1_L2": lookupL45C2,
-        "LANDSAT/LT04/C02/T2_L2": lookupL45C2,
-        "MODIS/006/MOD09GQ": lookupMOD09GQ,
-        "MODIS/006/MYD09GQ": lookupMOD09GQ,
-        "MODIS/006/MOD09GA": lookupMOD09GA,
-        "MODIS/006/MYD09GA": lookupMOD09GA,
-        "MODIS/006/MOD09Q1": lookupMOD09GQ,
-        "MODIS/006/MYD09Q1": lookupMOD09GQ,
-        "MODIS/006/MOD09A1": lookupMOD09GA,
-        "MODIS/006/MYD09A1": lookupMOD09GA,
-        "MODIS/006/MCD43A4": lookupMCD43A4,
-        "MODIS/061/MOD09GQ": lookupMOD09GQ,
-        "MODIS/061/MYD09GQ": lookupMOD09GQ,
-        "MODIS/061/MOD09GA": lookupMOD09GA,
-        "MODIS/061/MYD09GA": lookupMOD09GA,
-        "MODIS/061/MOD09Q1": lookupMOD09GQ,
-        "MODIS/061/MYD09Q1": lookupMOD09GQ,
-        "MODIS/061/MOD09A1": lookupMOD09GA,
-        "MODIS/061/MYD09A1": lookupMOD09GA,
-        "MODIS/061/MCD43A4": lookupMCD43A4,
+    Returns:
+        The rewritten formula and the scale and offset variables it uses.
+    """
+    table = _get_expression_table(platformDict)
+    names = set(re.findall(r"[A-Za-z_]\w*", formula))
+    bands = {
+        var: band
+        for var, band in table.items()
+        if var in names and isinstance(band, str)
+    }
+    parameters = {
+        **{var: value for var, value in table.items() if not isinstance(value, str)},
+        **parameters,
     }
 
-    plat = platformDict["platform"]
+    if _is_scale_invariant(formula, bands, scaleParams, offsetParams, parameters):
+        return formula, {}
+
+    # If the bands share their scale and it cancels out, only the offsets are applied,
+    # in raw units: f(scale * N + offset) = f(N + offset / scale).
+    scales = {scaleParams.get(band, 1) for band in bands.values()}
+    if len(scales) == 1 and _is_scale_invariant(
+        formula, bands, scaleParams, {}, parameters
+    ):
+        scale = scales.pop()
+        offsetParams = {
+            band: offsetParams.get(band, 0) / scale for band in bands.values()
+        }
+        scaleParams = {}
 
-    if plat not in list(lookupPlatform.keys()):
-        raise Exception(
-            f"Sorry, satellite platform {plat} not supported for spectral index computation!"
-        )
+    variables = {}
 
-    return lookupPlatform[platformDict["platform"]](img)
+    def substitute(match):
+        var = match.group(0)
+        if var not in bands:
+            return var
+        scale = scaleParams.get(bands[var], 1)
+        offset = offsetParams.get(bands[var], 0)
+        term = var
+        if scale != 1:
+            variables["scale_" + var] = scale
+            term = "{} * scale_{}".format(term, var)
+        if offset != 0:
+            variables["offset_" + var] = offset
+            term = "{} + offset_{}".format(term, var)
+        return term if term == var else "(" + term + ")"
+
+    return re.sub(r"[A-Za-z_]\w*", substitute, formula), variables
 
 
 def _get_indices(online: bool) -> dict:
@@ -242,14 +405,80 @@ def _get_indices(online: bool) -> dict:
         Indices.
     """
     if online:
-        with urllib.request.urlopen(
-            "https://raw.githubusercontent.com/awesome-spectral-indices/awesome-spectral-indices/main/output/spectral-indices-dict.json"
-        ) as url:
-            indices = json.loads(url.read().decode())
+        indices = _load_online_JSON(
+            "https://raw.githubusercontent.com/awesome-spectral-indices/awesome-spectral-indices/main/output/spectral-indices-dict.json",
+            "spectral-indices-dict.json",
+        )["SpectralIndices"]
     else:
-        indices = _load_JSON("spectral-indices-dict.json")
+        indices = _get_index_records()
+
+    return indices
+
+
+def _get_indices_subset(index: List[str], online: bool) -> dict:
+    """Retrieves the definitions of the requested indices only.
+
+    When the local copy is used, each index is read as a single record instead of
+    loading the whole dictionary of indices.
+
+    Args:
+        index : Names of the indices to retrieve.
+        online : Wheter to retrieve the most recent list of indices directly from the GitHub repository and not from the local copy.
+
+    Returns:
+        Indices. Names that are not built-in indices are left out.
+    """
+    if online:
+        indices = _get_indices(online)
+        return {idx: indices[idx] for idx in index if idx in indices}
+
+    indices = {idx: _load_record("spectral-indices-dict.json", idx) for idx in index}
+
+    return {idx: value for idx, value in indices.items() if value is not None}
+
+
+def _get_index_names(online: bool) -> List[str]:
+    """Retrieves the names of the indices.
+
+    When the local copy is used, only the names are read.
+
+    Args:
+        online : Wheter to retrieve the most recent list of indices directly from the GitHub repository and not from the local copy.
+
+    Returns:
+        Names of the indices.
+    """
+    if online:
+        return list(_get_indices(online).keys())
+
+    return list(_load_JSON_fields("spectral-indices-dict.json"))
+
+
+def _get_indices_of_domain(domain: str, online: bool) -> dict:
+    """Retrieves the definitions of the indices of an application domain.
+
+    When the local copy is used, only the application domain of each index is read to
+    select the indices, and then only the selected indices are loaded.
+
+    Args:
+        domain : Application domain (e.g. 'vegetation').
+        online : Wheter to retrieve the most recent list of indices directly from the GitHub repository and not from the local copy.
+
+    Returns:
+        Indices of the application domain.
+    """
+    if online:
+        indices = _get_indices(online)
+        return {
+            idx: value
+            for idx, value in indices.items()
+            if value["application_domain"] == domain
+        }
+
+    domains = _load_JSON_fields("spectral-indices-dict.json", ("application_domain",))
+    index = [idx for idx, value in domains.items() if value[0] == domain]
 
-    return indices["SpectralIndices"]
+    return _get_indices_subset(index, online)
 
 
 def _get_kernel_image(
@@ -1,13 +1,70 @@
 """
 ee_extra Extensions.
+
+Subpackages and top-level functions are imported lazily (PEP 562) on first attribute
+access, so `import ee_extra` only pays for the modules that are actually used.
 """
 
+import importlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
 __version__ = "0.0.15"
 
-from ee_extra.Image.basic import *
-from ee_extra.ImageCollection.core import *
-from ee_extra.QA import clouds, pipelines
-from ee_extra.Spectral import core
-from ee_extra.STAC import core
-from ee_extra.TimeSeries import core
-from ee_extra.Apps import core
+
+def _lazy_module(
+    name: str, submodules: Iterable[str], attributes: Optional[Dict[str, str]] = None
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """Creates module-level __getattr__ and __dir__ functions that import submodules
+    and attributes on first access.
+
+    Args:
+        name : Name of the module to populate (usually __name__).
+        submodules : Names of the submodules to import lazily.
+        attributes : Mapping of attribute names to the module that defines them.
+
+    Returns:
+        The __getattr__ and __dir__ functions for the module.
+    """
+    submodules = set(submodules)
+    attributes = attributes or {}
+    module = importlib.import_module(name)
+
+    def __getattr__(attr: str) -> Any:
+        if attr in submodules:
+            value = importlib.import_module(name + "." + attr)
+        elif attr in attributes:
+            value = getattr(importlib.import_module(attributes[attr]), attr)
+        else:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(name, attr)
+            )
+        setattr(module, attr, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(module)) | submodules | set(attributes))
+
+    return __getattr__, __dir__
+
+
+__getattr__, __dir__ = _lazy_module(
+    __name__,
+    [
+        "Algorithms",
+        "Apps",
+        "Image",
+        "ImageCollection",
+        "QA",
+        "STAC",
+        "Spectral",
+        "TimeSeries",
+        "catalog",
+        "fetch",
+        "utils",
+    ],
+    {
+        "minvalue": "ee_extra.Image.basic",
+        "maxvalue": "ee_extra.Image.basic",
+        "closest": "ee_extra.ImageCollection.core",
+    },
+)
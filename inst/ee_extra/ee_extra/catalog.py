@@ -0,0 +1,635 @@
+"""Compact, keyed copy of the JSON files bundled in the data directory.
+
+The JSON files in ``data/`` must be parsed completely before a single entry can be
+read. This module builds a SQLite file (``data/ee-catalog.sqlite``) where every entry
+of those files is stored as a compact JSON record under its key, so that one platform
+or one index can be fetched without materializing the whole catalog.
+
+The SQLite file is generated from the JSON files when the package is built (see
+setup.py) and is not kept under version control. It can also be rebuilt with:
+
+    python -m ee_extra.catalog
+
+If the SQLite file is missing or out of date with respect to the JSON files, lookups
+transparently fall back to the JSON files (e.g. when running from a source checkout).
+
+Entries can also be loaded with only some of their fields, or only their keys (see
+_load_fields()), either from the SQLite file or by parsing the JSON file incrementally,
+one entry at a time.
+
+It also defines the compact, read-only record types (DatasetRecord and IndexRecord)
+used to keep the catalog and the spectral indices in memory. Their memory usage can be
+compared against the raw dictionaries with:
+
+    python -m ee_extra.catalog --memory
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import tracemalloc
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+CATALOG_DB = "ee-catalog.sqlite"
+
+CATALOG_FILES = (
+    "ee-catalog-ids.json",
+    "ee-catalog-scale.json",
+    "ee-catalog-offset.json",
+    "spectral-indices-dict.json",
+    "ee-appshot.json",
+)
+
+# Files whose records live under a single top-level key.
+RECORD_ROOTS = {"spectral-indices-dict.json": "SpectralIndices"}
+
+
+def _records(x: str, data: Any) -> Dict[str, Any]:
+    """Gets the keyed records of a parsed data file.
+
+    Args:
+        x : JSON filename.
+        data : Parsed JSON file.
+
+    Returns:
+        Dictionary of records.
+    """
+    root = RECORD_ROOTS.get(x)
+    return data[root] if root is not None else data
+
+
+def _hash_file(path: str) -> str:
+    """Gets the SHA-1 hash of the content of a file.
+
+    Args:
+        path : Path of the file.
+
+    Returns:
+        Hexadecimal digest.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def buildCatalog(
+    output: Optional[str] = None,
+    files: Sequence[str] = CATALOG_FILES,
+    dataDir: str = DATA_DIR,
+) -> str:
+    """Builds the compact SQLite catalog from the JSON files in the data directory.
+
+    Args:
+        output : Path of the SQLite file to write. Defaults to data/ee-catalog.sqlite.
+        files : JSON filenames to include.
+        dataDir : Directory containing the JSON files.
+
+    Returns:
+        Path of the written SQLite file.
+
+    Examples:
+        >>> from ee_extra.catalog import buildCatalog
+        >>> buildCatalog()
+    """
+    if output is None:
+        output = os.path.join(dataDir, CATALOG_DB)
+
+    tmp = output + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute(
+            "CREATE TABLE sources (file TEXT PRIMARY KEY, size INTEGER, sha1 TEXT)"
+        )
+        con.execute(
+            "CREATE TABLE records (file TEXT, key TEXT, pos INTEGER, value TEXT)"
+        )
+        for x in files:
+            path = os.path.join(dataDir, x)
+            with open(path) as f:
+                data = json.load(f)
+            con.execute(
+                "INSERT INTO sources VALUES (?, ?, ?)",
+                (x, os.path.getsize(path), _hash_file(path)),
+            )
+            con.executemany(
+                "INSERT INTO records VALUES (?, ?, ?, ?)",
+                (
+                    (x, key, pos, json.dumps(value, separators=(",", ":")))
+                    for pos, (key, value) in enumerate(_records(x, data).items())
+                ),
+            )
+        con.execute("CREATE UNIQUE INDEX records_key ON records (file, key)")
+        con.commit()
+        con.execute("VACUUM")
+    finally:
+        con.close()
+
+    os.replace(tmp, output)
+
+    return output
+
+
+# Whitespace and separators between the keys and values of a JSON object.
+_ENTRY_SEPARATOR = re.compile(r"[ \t\n\r,]*")
+_KEY_SEPARATOR = re.compile(r"[ \t\n\r:]*")
+
+
+def _iter_entries(
+    path: str, root: Optional[str] = None, chunkSize: int = 64 * 1024
+) -> Iterator[Tuple[str, Any]]:
+    """Parses the entries of a JSON object incrementally, one at a time.
+
+    The file is read in chunks and each entry is decoded on its own, so only one entry
+    is materialized at a time instead of the whole document.
+
+    Args:
+        path : Path of the JSON file, holding an object.
+        root : Key of the object holding the entries (e.g. 'SpectralIndices'), if they
+            are not at the top level. It must be the only key of the top-level object.
+        chunkSize : Number of characters read at a time.
+
+    Yields:
+        Key and parsed value of each entry, in the order of the file.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path) as f:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def next_char(skip: Any = _ENTRY_SEPARATOR) -> str:
+            """Skips separators and gets the next character, reading more if needed."""
+            nonlocal buffer, position, eof
+            while True:
+                position = skip.match(buffer, position).end()
+                if position < len(buffer) or eof:
+                    return buffer[position : position + 1]
+                buffer, position = f.read(chunkSize), 0
+                eof = not buffer
+
+        def decode() -> Any:
+            """Decodes the next JSON value, reading more until it is complete."""
+            nonlocal buffer, position, eof
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    # Numbers and literals may continue in the next chunk.
+                    if end < len(buffer) or eof:
+                        position = end
+                        return value
+                except ValueError:
+                    if eof:
+                        raise
+                chunk = f.read(chunkSize)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+
+        def enter_object() -> None:
+            """Consumes the opening brace of an object."""
+            nonlocal position
+            if next_char() != "{":
+                raise ValueError("Expected a JSON object in {}".format(path))
+            position += 1
+
+        enter_object()
+        if root is not None:
+            next_char()
+            if decode() != root or next_char(_KEY_SEPARATOR) != "{":
+                raise ValueError("Expected the {} object in {}".format(root, path))
+            enter_object()
+
+        while next_char() not in ("}", ""):
+            key = decode()
+            next_char(_KEY_SEPARATOR)
+            yield key, decode()
+
+
+_SHARED_TUPLES: Dict[tuple, tuple] = {}
+
+
+def _compact(x: Any) -> Any:
+    """Converts a parsed JSON value into a compact, immutable value.
+
+    Strings are interned and lists become tuples that are shared between all records
+    holding equal values (e.g. the 'platforms' of the spectral indices).
+
+    Args:
+        x : Parsed JSON value.
+
+    Returns:
+        Compact value.
+    """
+    if isinstance(x, str):
+        return sys.intern(x)
+    if isinstance(x, list):
+        x = tuple(_compact(value) for value in x)
+        return _SHARED_TUPLES.setdefault(x, x)
+    return x
+
+
+class _Record(Mapping):
+    """Base class of the read-only records, with one slot per field.
+
+    Records behave as read-only mappings with the keys of the original JSON entries,
+    so they can be used wherever the parsed dictionaries were used. Subclasses define
+    FIELDS, mapping each JSON key to its slot.
+    """
+
+    __slots__ = ()
+    FIELDS: Dict[str, str] = {}
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        for key, attr in self.FIELDS.items():
+            object.__setattr__(self, attr, _compact(data.get(key)))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("{} is read-only".format(type(self).__name__))
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("{} is read-only".format(type(self).__name__))
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, self.FIELDS[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self) -> str:
+        return "{}({})".format(type(self).__name__, dict(self))
+
+
+class DatasetRecord(_Record):
+    """Dataset of the GEE STAC catalog (an entry of ee-catalog-ids.json)."""
+
+    FIELDS = {
+        "gee:type": "type",
+        "href": "href",
+        "sci:citation": "citation",
+        "sci:doi": "doi",
+    }
+    __slots__ = tuple(FIELDS.values())
+
+
+class IndexRecord(_Record):
+    """Spectral index (an entry of spectral-indices-dict.json)."""
+
+    FIELDS = {
+        "application_domain": "application_domain",
+        "bands": "bands",
+        "contributor": "contributor",
+        "date_of_addition": "date_of_addition",
+        "formula": "formula",
+        "long_name": "long_name",
+        "platforms": "platforms",
+        "reference": "reference",
+        "short_name": "short_name",
+    }
+    __slots__ = tuple(FIELDS.values())
+
+
+def _load_records(
+    x: str, recordType: Type[_Record], dataDir: str = DATA_DIR
+) -> Dict[str, _Record]:
+    """Loads all the entries of a data file as compact records.
+
+    Args:
+        x : JSON filename.
+        recordType : Record type of the entries.
+        dataDir : Directory containing the JSON files.
+
+    Returns:
+        Dictionary of records with interned keys.
+    """
+    with open(os.path.join(dataDir, x)) as f:
+        data = _records(x, json.load(f))
+
+    return {sys.intern(key): recordType(value) for key, value in data.items()}
+
+
+def _load_fields(
+    x: str, fields: Optional[Sequence[str]] = None, dataDir: str = DATA_DIR
+) -> Any:
+    """Loads only some fields of the entries of a data file, or only their keys.
+
+    The fields are read from the SQLite catalog when it is available and up to date,
+    without parsing the other fields. Otherwise, or if SQLite was built without the
+    JSON1 functions, the JSON file is parsed incrementally and only the requested
+    fields of each entry are kept.
+
+    Args:
+        x : JSON filename.
+        fields : Fields to keep (e.g. ['sci:doi']). If None, only the keys are loaded.
+        dataDir : Directory containing the JSON files.
+
+    Returns:
+        List of keys if fields is None, otherwise a dictionary with the tuple of values
+        of the fields (None for missing fields) of each entry.
+    """
+    if dataDir == DATA_DIR and _catalog_db.has(x):
+        try:
+            if fields is None:
+                return [sys.intern(key) for key in _catalog_db.keys(x)]
+            return {
+                sys.intern(key): tuple(_compact(value) for value in values)
+                for key, values in _catalog_db.project(x, fields)
+            }
+        except sqlite3.OperationalError:
+            # e.g. no such function: json_extract
+            pass
+
+    entries = _iter_entries(os.path.join(dataDir, x), RECORD_ROOTS.get(x))
+
+    if fields is None:
+        return [sys.intern(key) for key, _ in entries]
+
+    return {
+        sys.intern(key): tuple(_compact(value.get(field)) for field in fields)
+        for key, value in entries
+    }
+
+
+def _measure(load: Any) -> int:
+    """Measures the memory retained by the object returned by a function.
+
+    Args:
+        load : Function without arguments.
+
+    Returns:
+        Bytes allocated by the function and still in use after it returns.
+    """
+    tracemalloc.start()
+    try:
+        data = load()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del data
+    return size
+
+
+_MEMORY_FILES: Dict[str, Type[_Record]] = {
+    "ee-catalog-ids.json": DatasetRecord,
+    "spectral-indices-dict.json": IndexRecord,
+}
+
+
+def _measure_load(x: str, representation: str, dataDir: str = DATA_DIR) -> int:
+    """Measures the memory retained by one representation of a data file.
+
+    Args:
+        x : JSON filename, one of _MEMORY_FILES.
+        representation : 'dict' for the raw dictionary or 'records' for the records.
+        dataDir : Directory containing the JSON files.
+
+    Returns:
+        Bytes retained by the representation.
+    """
+    if representation == "records":
+        return _measure(lambda: _load_records(x, _MEMORY_FILES[x], dataDir))
+
+    def loadRaw() -> Any:
+        with open(os.path.join(dataDir, x)) as f:
+            return json.load(f)
+
+    return _measure(loadRaw)
+
+
+def compareMemory(dataDir: str = DATA_DIR) -> Dict[str, Dict[str, int]]:
+    """Compares the memory used by the raw dictionaries and by the compact records.
+
+    Each representation is measured in a new, isolated Python process (without site
+    packages or environment variables), so the measurements do not include the
+    strings and tuples that earlier loads or imports left interned or shared.
+
+    Args:
+        dataDir : Directory containing the JSON files.
+
+    Returns:
+        Bytes retained by each representation, per data file.
+
+    Examples:
+        >>> from ee_extra.catalog import compareMemory
+        >>> compareMemory()
+    """
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]); "
+        "from ee_extra.catalog import _measure_load; "
+        "print(_measure_load(*sys.argv[2:]))"
+    )
+
+    result = {}
+    for x in _MEMORY_FILES:
+        result[x] = {}
+        for representation in ["dict", "records"]:
+            args = [path, x, representation, dataDir]
+            output = subprocess.run(
+                [sys.executable, "-I", "-S", "-c", script] + args,
+                check=True,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            ).stdout
+            result[x][representation] = int(output)
+
+    return result
+
+
+class _CatalogDB:
+    """Read-only access to the compact SQLite catalog.
+
+    A single connection is shared by all threads and serialized with a lock. Files are
+    only served from SQLite when the size and content hash recorded at build time match
+    the JSON file on disk; otherwise the caller is expected to fall back to the JSON
+    file. The hash is only computed again when the size or modification time of the
+    JSON file changes.
+    """
+
+    def __init__(self, path: str, dataDir: str = DATA_DIR) -> None:
+        self._path = path
+        self._dataDir = dataDir
+        self._lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+        self._sources: Optional[Dict[str, Tuple[int, str]]] = None
+        self._verified: Dict[str, Tuple[int, int]] = {}
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Opens the SQLite file on first use. Must be called with the lock held.
+
+        Returns:
+            The connection, or None if the SQLite file is not available.
+        """
+        if self._sources is None:
+            self._sources = {}
+            if os.path.exists(self._path):
+                try:
+                    uri = pathlib.Path(os.path.abspath(self._path)).as_uri()
+                    self._con = sqlite3.connect(
+                        uri + "?mode=ro&immutable=1", uri=True, check_same_thread=False
+                    )
+                    self._sources = {
+                        x: (size, sha1)
+                        for x, size, sha1 in self._con.execute(
+                            "SELECT file, size, sha1 FROM sources"
+                        )
+                    }
+                except sqlite3.Error:
+                    self._con = None
+                    self._sources = {}
+        return self._con
+
+    def has(self, x: str) -> bool:
+        """Checks whether a data file can be served from the SQLite catalog.
+
+        Args:
+            x : JSON filename.
+
+        Returns:
+            Whether the file is in the catalog and up to date.
+        """
+        with self._lock:
+            if self._connect() is None or x not in self._sources:
+                return False
+            path = os.path.join(self._dataDir, x)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return True
+            size, sha1 = self._sources[x]
+            if stat.st_size != size:
+                return False
+            state = (stat.st_size, stat.st_mtime_ns)
+            if self._verified.get(x) != state:
+                if _hash_file(path) != sha1:
+                    return False
+                self._verified[x] = state
+            return True
+
+    def get(self, x: str, key: str) -> Any:
+        """Gets a single record.
+
+        Args:
+            x : JSON filename.
+            key : Record key.
+
+        Returns:
+            The parsed record, or None if the key does not exist.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM records WHERE file = ? AND key = ?", (x, key)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def keys(self, x: str) -> List[str]:
+        """Gets the keys of all records of a data file, in their original order.
+
+        Args:
+            x : JSON filename.
+
+        Returns:
+            List of keys.
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key FROM records WHERE file = ? ORDER BY pos", (x,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def project(self, x: str, fields: Sequence[str]) -> List[Tuple[str, tuple]]:
+        """Gets some fields of all records of a data file, in their original order.
+
+        The fields are extracted by SQLite, so the records are not parsed in Python.
+        Their values are the same as in the JSON file.
+
+        Args:
+            x : JSON filename.
+            fields : Fields to get.
+
+        Returns:
+            List of keys with the tuple of values of the fields (None if missing).
+        """
+        paths = [json.dumps(field).join(["$.", ""]) for field in fields]
+        columns = ", ".join(
+            "json_extract(value, ?), json_type(value, ?)" for _ in fields
+        )
+        query = "SELECT key, {} FROM records WHERE file = ? ORDER BY pos".format(
+            columns
+        )
+        params = [path for path in paths for _ in range(2)] + [x]
+
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+
+        result = []
+        for key, *row in rows:
+            values = []
+            for value, kind in zip(row[::2], row[1::2]):
+                # json_extract() returns booleans as 0 or 1, and objects and arrays
+                # as JSON text.
+                if kind in ("true", "false"):
+                    value = kind == "true"
+                elif kind in ("array", "object"):
+                    value = json.loads(value)
+                values.append(value)
+            result.append((key, tuple(values)))
+        return result
+
+
+_catalog_db = _CatalogDB(os.path.join(DATA_DIR, CATALOG_DB))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command-line entry point to rebuild the compact SQLite catalog."""
+    parser = argparse.ArgumentParser(
+        prog="python -m ee_extra.catalog",
+        description="Build the compact SQLite copy of the ee_extra data files.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Output file (default: data/{}).".format(CATALOG_DB),
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Compare the memory used by the raw dictionaries and the records instead.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        for x, sizes in compareMemory().items():
+            print(
+                "{}: dict {:.0f} KiB, records {:.0f} KiB ({:.0%})".format(
+                    x,
+                    sizes["dict"] / 1024,
+                    sizes["records"] / 1024,
+                    sizes["records"] / sizes["dict"],
+                )
+            )
+    else:
+        print(buildCatalog(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""Cached HTTP fetches of remote JSON documents (e.g. the STAC of a dataset).
+
+Responses are kept in a cache. Fresh entries (younger than the TTL) are served without
+any request, stale entries are revalidated with conditional requests (ETag /
+Last-Modified) and the cache is bounded in size by evicting the least recently used
+entries. In offline mode, or when the server cannot be reached, stale entries are
+served instead of failing.
+
+By default the cache only lives in memory, for the current process. Nothing is written
+to disk unless a cache directory is given (opt-in), with configureCache(directory=...)
+or the EE_EXTRA_CACHE_DIR environment variable, e.g. the user cache directory of the
+calling application (tools::R_user_dir("rgeeExtra", "cache") in R).
+
+Requests go through a pool of keep-alive connections shared by all threads, so
+fetching many documents from the same host reuses a few connections. The proxies of
+the environment (HTTP_PROXY, HTTPS_PROXY and NO_PROXY) are honoured.
+
+The cache is configured with configureCache() or with the environment variables
+EE_EXTRA_CACHE_DIR and EE_EXTRA_OFFLINE.
+"""
+
+import base64
+import collections
+import email.message
+import hashlib
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _default_cache_dir() -> Optional[str]:
+    """Gets the default directory of the HTTP cache.
+
+    Returns:
+        The http subdirectory of EE_EXTRA_CACHE_DIR if it is set, otherwise None (the
+        cache is kept in memory only).
+    """
+    directory = os.environ.get("EE_EXTRA_CACHE_DIR")
+    if not directory:
+        return None
+    return os.path.join(os.path.expanduser(directory), "http")
+
+
+def _get_proxy(scheme: str, host: str) -> Optional[str]:
+    """Gets the proxy of the environment to use for a request.
+
+    Args:
+        scheme : Scheme of the request ('http' or 'https').
+        host : Host of the request.
+
+    Returns:
+        URL of the proxy, or None to connect directly.
+    """
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    if "://" not in proxy:
+        proxy = "http://" + proxy
+    return proxy
+
+
+def _get_proxy_headers(proxy: str) -> Dict[str, str]:
+    """Gets the headers authenticating to a proxy with the credentials of its URL.
+
+    Args:
+        proxy : URL of the proxy.
+
+    Returns:
+        Proxy-Authorization header, if the URL has credentials.
+    """
+    parts = urllib.parse.urlsplit(proxy)
+    if not parts.username:
+        return {}
+    credentials = "{}:{}".format(
+        urllib.parse.unquote(parts.username), urllib.parse.unquote(parts.password or "")
+    )
+    return {
+        "Proxy-Authorization": "Basic "
+        + base64.b64encode(credentials.encode()).decode("ascii")
+    }
+
+
+class _ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections, per host and proxy.
+
+    Plain HTTP requests are sent to the proxy with the absolute URL, HTTPS requests are
+    tunneled through the proxy with CONNECT.
+
+    Args:
+        maxsize : Maximum number of idle connections kept per host.
+    """
+
+    REDIRECTS = (301, 302, 303, 307, 308)
+
+    def __init__(self, maxsize: int = 16) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._idle: Dict[
+            Tuple[str, str, Optional[str]], List[http.client.HTTPConnection]
+        ] = {}
+
+    def _connect(
+        self, scheme: str, netloc: str, proxy: Optional[str], timeout: float
+    ) -> http.client.HTTPConnection:
+        """Opens a new connection to a host, through a proxy if given."""
+        if proxy is None:
+            if scheme == "https":
+                return http.client.HTTPSConnection(netloc, timeout=timeout)
+            return http.client.HTTPConnection(netloc, timeout=timeout)
+
+        proxyNetloc = urllib.parse.urlsplit(proxy).netloc.rpartition("@")[2]
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(proxyNetloc, timeout=timeout)
+            connection.set_tunnel(netloc, headers=_get_proxy_headers(proxy))
+            return connection
+        return http.client.HTTPConnection(proxyNetloc, timeout=timeout)
+
+    def _acquire(
+        self, scheme: str, netloc: str, proxy: Optional[str], timeout: float
+    ) -> http.client.HTTPConnection:
+        """Gets an idle connection to a host or opens a new one."""
+        with self._lock:
+            idle = self._idle.get((scheme, netloc, proxy))
+            if idle:
+                connection = idle.pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection
+        return self._connect(scheme, netloc, proxy, timeout)
+
+    def _release(
+        self,
+        scheme: str,
+        netloc: str,
+        proxy: Optional[str],
+        connection: http.client.HTTPConnection,
+    ) -> None:
+        """Returns a connection to the pool, or closes it if the pool is full."""
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc, proxy), [])
+            if len(idle) < self.maxsize:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def request(
+        self, url: str, headers: Dict[str, str], timeout: float, redirects: int = 5
+    ) -> Tuple[int, email.message.Message, bytes]:
+        """Performs a GET request, following redirects.
+
+        Args:
+            url : URL to fetch.
+            headers : Request headers.
+            timeout : Timeout in seconds.
+            redirects : Maximum number of redirects to follow.
+
+        Returns:
+            Status, headers and body of the response.
+
+        Raises:
+            urllib.error.HTTPError : If a redirect has no Location header or there are
+                too many redirects.
+        """
+        parts = urllib.parse.urlsplit(url)
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        proxy = _get_proxy(parts.scheme, parts.hostname or "")
+        requestHeaders = dict(headers)
+        if proxy is not None and parts.scheme == "http":
+            path = urllib.parse.urlunsplit(parts._replace(fragment=""))
+            requestHeaders.update(_get_proxy_headers(proxy))
+
+        for attempt in range(2):
+            connection = self._acquire(parts.scheme, parts.netloc, proxy, timeout)
+            reused = connection.sock is not None
+            try:
+                connection.request("GET", path, headers=requestHeaders)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                # A kept-alive connection may have been closed by the server.
+                if reused and attempt == 0:
+                    continue
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(parts.scheme, parts.netloc, proxy, connection)
+            break
+
+        if response.status in self.REDIRECTS:
+            location = response.headers.get("Location")
+            if not location or redirects <= 0:
+                raise urllib.error.HTTPError(
+                    url,
+                    response.status,
+                    "Too many redirects" if location else "Redirect without Location",
+                    response.headers,
+                    None,
+                )
+            location = urllib.parse.urljoin(url, location)
+            return self.request(location, headers, timeout, redirects - 1)
+
+        return response.status, response.headers, body
+
+    def clear(self) -> None:
+        """Closes all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+
+_connection_pool = _ConnectionPool()
+
+
+class _HTTPCache:
+    """Size-bounded cache of HTTP responses, in memory or persistent on disk.
+
+    On disk, each entry is stored as two files named after the hash of the URL: the
+    body and a small JSON file with its validators (ETag, Last-Modified) and the time
+    it was last validated. The modification time of the metadata file records the last
+    access and is used for LRU eviction. In memory, the same entries are kept in LRU
+    order.
+
+    Args:
+        directory : Directory of the cache. If None, the cache is kept in memory only.
+        ttl : Seconds during which an entry is served without revalidation.
+        maxsize : Maximum total size of the cached bodies in bytes.
+        timeout : Timeout of each request in seconds.
+        offline : Whether to never contact the server and serve stale entries instead.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: float = 24 * 3600,
+        maxsize: int = 256 * 1024 ** 2,
+        timeout: float = 30,
+        offline: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._memory: "collections.OrderedDict[str, Dict[str, Any]]" = (
+            collections.OrderedDict()
+        )
+
+    def _paths(self, url: str) -> Dict[str, str]:
+        """Gets the paths of the body and metadata files of an URL."""
+        key = hashlib.sha1(url.encode()).hexdigest()
+        return {
+            "body": os.path.join(self.directory, key + ".body"),
+            "meta": os.path.join(self.directory, key + ".json"),
+        }
+
+    def _read(self, url: str) -> Optional[Dict[str, Any]]:
+        """Reads a cached entry and marks it as recently used.
+
+        Returns:
+            Metadata of the entry with its body under 'body', or None if not cached.
+        """
+        if self.directory is None:
+            with self._lock:
+                meta = self._memory.get(url)
+                if meta is None:
+                    return None
+                self._memory.move_to_end(url)
+                return dict(meta)
+
+        paths = self._paths(url)
+        try:
+            with open(paths["meta"]) as f:
+                meta = json.load(f)
+            with open(paths["body"], "rb") as f:
+                meta["body"] = f.read()
+            os.utime(paths["meta"])
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def _write_file(self, path: str, data: bytes) -> None:
+        """Writes a file atomically."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _write(self, url: str, body: bytes, headers: Any) -> None:
+        """Stores an entry and evicts old entries if the cache is too large."""
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "validated": time.time(),
+        }
+        if self.directory is None:
+            with self._lock:
+                self._memory[url] = {**meta, "body": body}
+                self._memory.move_to_end(url)
+                total = sum(len(entry["body"]) for entry in self._memory.values())
+                while total > self.maxsize and self._memory:
+                    _, evicted = self._memory.popitem(last=False)
+                    total -= len(evicted["body"])
+            return
+
+        paths = self._paths(url)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write_file(paths["body"], body)
+            self._write_file(paths["meta"], json.dumps(meta).encode())
+            self._evict()
+
+    def _touch(self, url: str, meta: Dict[str, Any]) -> None:
+        """Records that a cached entry was successfully revalidated."""
+        if self.directory is None:
+            with self._lock:
+                if url in self._memory:
+                    self._memory[url]["validated"] = time.time()
+            return
+
+        meta = {key: value for key, value in meta.items() if key != "body"}
+        meta["validated"] = time.time()
+        with self._lock:
+            self._write_file(self._paths(url)["meta"], json.dumps(meta).encode())
+
+    def _evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in maxsize.
+        Must be called with the lock held."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta = os.path.join(self.directory, name)
+            body = meta[: -len(".json")] + ".body"
+            try:
+                size = os.path.getsize(body)
+                entries.append((os.path.getmtime(meta), meta, body, size))
+            except OSError:
+                continue
+            total += size
+        for _, meta, body, size in sorted(entries):
+            if total <= self.maxsize:
+                break
+            for path in (meta, body):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def _request(
+        self, url: str, cached: Optional[Dict[str, Any]]
+    ) -> Optional[Tuple[bytes, email.message.Message]]:
+        """Performs a (conditional) GET request through the connection pool.
+
+        Returns:
+            The body and headers of the response, or None if the server answered 304
+            Not Modified.
+
+        Raises:
+            urllib.error.HTTPError : If the server did not answer with a successful
+                status (or 304 Not Modified to a conditional request).
+        """
+        headers = {"Accept-Encoding": "identity"}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        status, responseHeaders, body = _connection_pool.request(
+            url, headers, self.timeout
+        )
+
+        if status == 304 and cached is not None:
+            return None
+        if not 200 <= status < 300:
+            raise urllib.error.HTTPError(
+                url,
+                status,
+                http.client.responses.get(status, "HTTP Error"),
+                responseHeaders,
+                None,
+            )
+
+        return body, responseHeaders
+
+    def fetch(self, url: str, useCache: bool = True) -> bytes:
+        """Gets the body of an URL, from the cache when possible.
+
+        Args:
+            url : URL to fetch.
+            useCache : Whether to use the cache. If False, the document is always
+                downloaded and the cache is neither read nor written (e.g. for bulk
+                downloads that would only fill it).
+
+        Returns:
+            Body of the response.
+        """
+        if not useCache:
+            if self.offline:
+                raise ConnectionError(
+                    "{} cannot be downloaded, ee_extra is in offline mode.".format(url)
+                )
+            return self._request(url, None)[0]
+
+        cached = self._read(url)
+
+        if cached is not None and time.time() - cached["validated"] < self.ttl:
+            return cached["body"]
+
+        if self.offline:
+            if cached is None:
+                raise ConnectionError(
+                    "{} is not cached and ee_extra is in offline mode.".format(url)
+                )
+            return cached["body"]
+
+        try:
+            response = self._request(url, cached)
+        except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+            if cached is None:
+                raise
+            warnings.warn(
+                "Serving a stale copy of {}, the server could not be reached: {}".format(
+                    url, e
+                )
+            )
+            return cached["body"]
+
+        # The cache is best effort: failing to write it must not fail the fetch.
+        try:
+            if response is None:
+                self._touch(url, cached)
+                return cached["body"]
+            self._write(url, *response)
+        except OSError:
+            pass
+
+        return response[0]
+
+    def fetchJSON(self, url: str) -> Any:
+        """Gets and parses a JSON document, from the cache when possible.
+
+        Args:
+            url : URL to fetch.
+
+        Returns:
+            Parsed JSON document.
+        """
+        return json.loads(self.fetch(url).decode())
+
+    def clear(self) -> None:
+        """Removes all cached entries."""
+        with self._lock:
+            self._memory.clear()
+            if self.directory is None or not os.path.isdir(self.directory):
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith((".json", ".body")):
+                    os.remove(os.path.join(self.directory, name))
+
+
+_http_cache = _HTTPCache(
+    directory=_default_cache_dir(),
+    offline=os.environ.get("EE_EXTRA_OFFLINE", "") not in ("", "0"),
+)
+
+
+def configureCache(
+    directory: Optional[str] = None,
+    ttl: Optional[float] = None,
+    maxsize: Optional[int] = None,
+    timeout: Optional[float] = None,
+    offline: Optional[bool] = None,
+) -> None:
+    """Configures the HTTP cache used to fetch remote documents such as STACs.
+
+    Arguments left as None keep their current value.
+
+    Args:
+        directory : Directory of the persistent cache, which enables caching on disk.
+            An empty string keeps the cache in memory only (the default).
+        ttl : Seconds during which a cached document is used without revalidation.
+        maxsize : Maximum total size of the cache in bytes.
+        timeout : Timeout of each request in seconds.
+        offline : Whether to never contact the server and serve cached (possibly
+            stale) documents instead.
+
+    Examples:
+        >>> from ee_extra.fetch import configureCache
+        >>> configureCache(directory="~/.cache/ee_extra/http", ttl=7 * 24 * 3600)
+    """
+    with _http_cache._lock:
+        if directory is not None:
+            _http_cache.directory = os.path.expanduser(directory) if directory else None
+        if ttl is not None:
+            _http_cache.ttl = ttl
+        if maxsize is not None:
+            _http_cache.maxsize = maxsize
+        if timeout is not None:
+            _http_cache.timeout = timeout
+        if offline is not None:
+            _http_cache.offline = offline
@@ -1,35 +1,362 @@
 import difflib
+import functools
+import heapq
+import http.client
 import json
 import os
-from typing import Any, Optional, List, Sequence
+import threading
+import time
+import urllib.error
+import warnings
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Optional, List, Sequence, Tuple
 
 import ee
-import pkg_resources
+
+from ee_extra.catalog import (
+    DATA_DIR,
+    RECORD_ROOTS,
+    DatasetRecord,
+    IndexRecord,
+    _catalog_db,
+    _load_fields,
+    _load_records,
+)
+from ee_extra.fetch import _http_cache
+
+
+def _freeze(x: Any) -> Any:
+    """Recursively converts parsed JSON into read-only containers.
+
+    Args:
+        x : Parsed JSON value.
+
+    Returns:
+        The same value with dictionaries wrapped as read-only mappings and lists
+        converted to tuples.
+    """
+    if isinstance(x, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in x.items()})
+    if isinstance(x, list):
+        return tuple(_freeze(value) for value in x)
+    return x
+
+
+def _thaw(x: Any) -> Any:
+    """Recursively converts a read-only view back into plain (mutable) JSON objects.
+
+    Args:
+        x : Value returned by _load_JSON() or one of its items, or a record.
+
+    Returns:
+        A fresh copy made of plain dictionaries and lists.
+    """
+    if isinstance(x, Mapping):
+        return {key: _thaw(value) for key, value in x.items()}
+    if isinstance(x, tuple):
+        return [_thaw(value) for value in x]
+    return x
+
+
+class _CatalogStore:
+    """Thread-safe, process-wide store of the JSON files bundled in the data directory.
+
+    Each file is parsed at most once per process and is handed out as a read-only view
+    (see _freeze()), so callers can share it without copying. Hits and misses are
+    counted to confirm that repeated lookups do not touch the disk again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, x: str) -> Any:
+        """Gets the read-only view of a data file, parsing it on the first request.
+
+        Args:
+            x : JSON filename.
+
+        Returns:
+            Read-only view of the JSON file.
+        """
+        with self._lock:
+            if x in self._data:
+                self._hits += 1
+                return self._data[x]
+            self._misses += 1
+            with open(os.path.join(DATA_DIR, x)) as f:
+                data = _freeze(json.load(f))
+            self._data[x] = data
+            return data
+
+    def stats(self) -> Dict[str, Any]:
+        """Gets the hit and miss counters of the store.
+
+        Returns:
+            Dictionary with the number of hits, misses and the files currently loaded.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "files": sorted(self._data.keys()),
+            }
+
+    def clear(self) -> None:
+        """Drops all loaded files and resets the counters."""
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+_catalog_store = _CatalogStore()
 
 
 def _load_JSON(x: Optional[str] = "ee-catalog-ids.json") -> Any:
     """Loads the specified JSON file from the data directory.
 
+    The file is parsed once per process and shared afterwards. The returned object is
+    read-only; use _thaw() to get a mutable copy before handing it to users.
+
+    Args:
+        x : JSON filename.
+
+    Returns:
+        Read-only view of the JSON file.
+    """
+    return _catalog_store.get(x)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_JSON_fields(x: str, fields: Optional[Tuple[str, ...]] = None) -> Any:
+    """Loads only some fields of the entries of a data file, or only their keys.
+
+    Only the requested fields are read (see ee_extra.catalog._load_fields()), so memory
+    and parse time depend on what the caller needs instead of on the whole file. The
+    result is loaded once per process.
+
     Args:
         x : JSON filename.
+        fields : Fields to keep (e.g. ('sci:doi',)). If None, only the keys are loaded.
+
+    Returns:
+        Tuple of keys if fields is None, otherwise a read-only mapping with the tuple of
+        values of the fields of each entry.
+    """
+    if fields is None:
+        return tuple(_load_fields(x))
+
+    return MappingProxyType(_load_fields(x, fields))
+
+
+_online_memo: Dict[str, Tuple[float, Any]] = {}
+_online_memo_lock = threading.Lock()
+
+# Seconds during which the bundled copy is used, without retrying, after the online
+# version could not be fetched.
+_ONLINE_RETRY = 5 * 60
+
+
+def _load_online_JSON(url: str, x: str) -> Any:
+    """Loads the most recent version of a bundled JSON file from its online source.
+
+    The document is fetched through the HTTP cache of ee_extra.fetch (on-disk cache,
+    TTL and conditional requests) and memoized in the process for the same TTL, so
+    repeated calls cost at most one request per TTL. If it cannot be fetched, the
+    bundled copy is used instead, with a warning, and memoized for _ONLINE_RETRY
+    seconds (or the TTL if shorter), so an outage does not cost a request and a
+    warning per call.
+
+    Args:
+        url : URL of the online version.
+        x : JSON filename of the bundled copy.
 
     Returns:
-        JSON file.
+        Read-only view of the JSON document.
     """
-    eeExtraDir = os.path.dirname(
-        pkg_resources.resource_filename("ee_extra", "ee_extra.py")
-    )
-    dataPath = os.path.join(eeExtraDir, "data/" + x)
-    f = open(dataPath)
-    data = json.load(f)
+    with _online_memo_lock:
+        memo = _online_memo.get(url)
+    if memo is not None and time.time() < memo[0]:
+        return memo[1]
+
+    try:
+        data = _freeze(_http_cache.fetchJSON(url))
+        ttl = _http_cache.ttl
+    except (
+        urllib.error.URLError,
+        http.client.HTTPException,
+        OSError,
+        ValueError,
+    ) as e:
+        warnings.warn(
+            "Could not retrieve {}, using the local copy instead: {}".format(url, e)
+        )
+        data = _load_JSON(x)
+        ttl = min(_ONLINE_RETRY, _http_cache.ttl)
+
+    with _online_memo_lock:
+        _online_memo[url] = (time.time() + ttl, data)
 
     return data
 
 
+@functools.lru_cache(maxsize=4096)
+def _load_record(x: str, key: str) -> Any:
+    """Loads a single record (top-level entry) of the specified data file.
+
+    The record is read from the compact SQLite catalog when it is available and up to
+    date, so the whole JSON file does not need to be parsed. Otherwise the record is
+    taken from the JSON file loaded with _load_JSON().
+
+    Args:
+        x : JSON filename.
+        key : Key of the record, e.g. a platform ID or an index name.
+
+    Returns:
+        Read-only view of the record, or None if the key does not exist.
+    """
+    if _catalog_db.has(x):
+        return _freeze(_catalog_db.get(x, key))
+
+    data = _load_JSON(x)
+    root = RECORD_ROOTS.get(x)
+    if root is not None:
+        data = data[root]
+
+    return data.get(key)
+
+
+class _CloseMatcher:
+    """Case-insensitive "did you mean" matcher over a fixed set of candidates.
+
+    The candidates are lowercased once and indexed by their character trigrams. A
+    query only scores (with the same similarity ratio as difflib.get_close_matches) the
+    candidates sharing the most trigrams with it, instead of the whole set.
+
+    Args:
+        possibilities : Candidate strings.
+        shortlist : Number of candidates, ranked by shared trigrams, that are scored.
+            Sets with at most this many candidates are always scored completely.
+    """
+
+    def __init__(self, possibilities: Sequence[str], shortlist: int = 64) -> None:
+        self.possibilities = list(possibilities)
+        self.lowered = [p.lower() for p in self.possibilities]
+        self.shortlist = shortlist
+        self.trigrams: Dict[str, List[int]] = {}
+        for i, p in enumerate(self.lowered):
+            for trigram in self._trigrams(p):
+                self.trigrams.setdefault(trigram, []).append(i)
+
+    @staticmethod
+    def _trigrams(word: str) -> set:
+        """Gets the set of character trigrams of a word, padded with spaces."""
+        padded = "  " + word + " "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    def scores(
+        self, word: str, n: int = 3, cutoff: float = 0.6
+    ) -> List[Tuple[str, float]]:
+        """Gets the closest candidates to a word and their similarity ratios.
+
+        Args:
+            word : A string for which close matches are desired.
+            n : The maximum number of close matches to return. n must be > 0.
+            cutoff : Candidates that don't score at least that similar to word are ignored.
+
+        Returns:
+            List of (candidate, ratio) tuples, most similar first.
+        """
+        word = word.lower()
+
+        if len(self.possibilities) <= self.shortlist:
+            candidates: Sequence[int] = range(len(self.possibilities))
+        else:
+            shared: Dict[int, int] = {}
+            for trigram in self._trigrams(word):
+                for i in self.trigrams.get(trigram, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            candidates = heapq.nlargest(self.shortlist, shared, key=shared.get)
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(word)
+        result = []
+        for i in candidates:
+            matcher.set_seq1(self.lowered[i])
+            if (
+                matcher.real_quick_ratio() >= cutoff
+                and matcher.quick_ratio() >= cutoff
+                and matcher.ratio() >= cutoff
+            ):
+                result.append((matcher.ratio(), self.possibilities[i]))
+
+        best = heapq.nlargest(n, result)
+        return [(p, ratio) for ratio, p in best]
+
+    def get(self, word: str, n: int = 3, cutoff: float = 0.6) -> List[str]:
+        """Gets the closest candidates to a word.
+
+        Args:
+            word : A string for which close matches are desired.
+            n : The maximum number of close matches to return. n must be > 0.
+            cutoff : Candidates that don't score at least that similar to word are ignored.
+
+        Returns:
+            List of candidates, most similar first.
+        """
+        return [p for p, _ in self.scores(word, n, cutoff)]
+
+
+@functools.lru_cache(maxsize=32)
+def _get_close_matcher(possibilities: Tuple[str, ...]) -> _CloseMatcher:
+    """Gets the (cached) close matcher of a set of candidates.
+
+    Args:
+        possibilities : Candidate strings.
+
+    Returns:
+        Close matcher.
+    """
+    return _CloseMatcher(possibilities)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_dataset_records() -> Dict[str, DatasetRecord]:
+    """Gets the datasets of the GEE STAC catalog as compact records.
+
+    The records are built once per process and use far less memory than the parsed
+    JSON file, which is not kept.
+
+    Returns:
+        Dictionary of records, keyed by dataset ID.
+    """
+    return _load_records("ee-catalog-ids.json", DatasetRecord)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_index_records() -> Dict[str, IndexRecord]:
+    """Gets the bundled spectral indices as compact records.
+
+    The records are built once per process and use far less memory than the parsed
+    JSON file, which is not kept.
+
+    Returns:
+        Dictionary of records, keyed by index name.
+    """
+    return _load_records("spectral-indices-dict.json", IndexRecord)
+
+
 def _get_case_insensitive_close_matches(
-    word: str, possibilities: List[str], n: int = 3, cutoff: float = 0.6
+    word: str, possibilities: Sequence[str], n: int = 3, cutoff: float = 0.6
 ) -> List[str]:
-    """A case-insensitive wrapper around difflib.get_close_matches.
+    """A case-insensitive version of difflib.get_close_matches.
+
+    The candidates are indexed once (see _CloseMatcher) and the index is reused by
+    later calls with the same candidates.
 
     Args:
         word : A string for which close matches are desired.
@@ -46,10 +373,7 @@ def _get_case_insensitive_close_matches(
         >>> _get_case_insensitive_close_matches("mse", ["MSE", "ERGAS"])
         ["MSE"]
     """
-    lower_matches = difflib.get_close_matches(
-        word.lower(), [p.lower() for p in possibilities], n, cutoff
-    )
-    return [p for p in possibilities if p.lower() in lower_matches]
+    return _get_close_matcher(tuple(possibilities)).get(word, n, cutoff)
 
 
 def _filter_image_bands(img: ee.Image, keep_bands: Sequence[str]) -> ee.Image:
@@ -1,8 +1,10 @@
+import importlib.util
 import io
 import os
 import re
 
 from setuptools import find_packages, setup
+from setuptools.command.build_py import build_py
 
 
 def read(filename):
@@ -12,6 +14,26 @@ def read(filename):
         return re.sub(text_type(r":[a-z]+:`~?(.*?)`"), text_type(r"``\1``"), fd.read())
 
 
+class BuildPyCommand(build_py):
+    """Generates the SQLite catalog (see ee_extra/catalog.py) from the JSON files."""
+
+    def run(self):
+        build_py.run(self)
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ee_extra")
+        if getattr(self, "editable_mode", False):
+            dataDir = os.path.join(path, "data")
+        else:
+            dataDir = os.path.join(self.build_lib, "ee_extra", "data")
+        # Loaded from its path so the build does not need the package dependencies.
+        spec = importlib.util.spec_from_file_location(
+            "_ee_extra_catalog", os.path.join(path, "catalog.py")
+        )
+        catalog = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(catalog)
+        self.announce("building the SQLite catalog in {}".format(dataDir), level=2)
+        catalog.buildCatalog(dataDir=dataDir)
+
+
 setup(
     name="ee_extra",
     version="0.0.15",
@@ -23,8 +45,12 @@ setup(
     long_description=read("README.md"),
     long_description_content_type="text/markdown",
     packages=find_packages(exclude=("tests",), include=["ee_extra", "ee_extra.*"]),
-    package_data={"ee_extra": ["data/*.json"]},
+    package_data={"ee_extra": ["data/*.json", "data/*.sqlite"]},
     install_requires=["earthengine-api"],
+    cmdclass={"build_py": BuildPyCommand},
+    entry_points={
+        "console_scripts": ["ee_extra-stac-bundle=ee_extra.STAC.bundle:main"]
+    },
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "License :: OSI Approved :: Apache Software License",
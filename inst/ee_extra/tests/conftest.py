@@ -0,0 +1,81 @@
+import http.server
+import json
+import threading
+import time
+
+import ee
+import pytest
+from ee import apitestcase
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    """Local stand-in for the STAC server.
+
+    Paths listed in server.routes answer with their (status, headers, body). Any other
+    path answers with a small JSON document and an ETag, and with 304 Not Modified to
+    conditional requests carrying that ETag. Requests are recorded in server.hits, the
+    client connections in server.clients and the highest number of requests served at
+    once in server.concurrency. Each request takes at least server.delay seconds.
+    """
+
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits.append((self.path, dict(self.headers)))
+            server.clients.add(self.client_address)
+            server.active += 1
+            server.concurrency = max(server.concurrency, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        if self.path in server.routes:
+            status, headers, body = server.routes[self.path]
+        elif self.headers.get("If-None-Match") == '"v1"':
+            status, headers, body = 304, {}, b""
+        else:
+            status, headers = 200, {"ETag": '"v1"'}
+            body = json.dumps({"id": self.path}).encode()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.hits = []
+    server.routes = {}
+    server.clients = set()
+    server.delay = 0
+    server.lock = threading.Lock()
+    server.active = 0
+    server.concurrency = 0
+    server.url = "http://127.0.0.1:{}".format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def ee_offline(monkeypatch):
+    """Initializes Earth Engine with the algorithms bundled with earthengine-api, so
+    expressions can be built and inspected without credentials or network access."""
+    ee.Reset()
+    monkeypatch.setattr(ee.data, "_install_cloud_api_resource", lambda: None)
+    monkeypatch.setattr(ee.data, "getAlgorithms", apitestcase.GetAlgorithms)
+    ee.Initialize(None, "", project="ee-extra-tests")
+    yield ee
+    ee.Reset()
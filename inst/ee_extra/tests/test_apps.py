@@ -0,0 +1,27 @@
+import pytest
+
+from ee_extra.Apps.core import searchApps
+from ee_extra.Apps.utils import _AppsIndex
+
+APPS = {
+    "alice": [
+        "https://alice.users.earthengine.app/view/ndvi-explorer",
+        "https://alice.users.earthengine.app/view/myndvi",
+    ],
+    "bob": ["https://bob.users.earthengine.app/view/NDVI-trends"],
+}
+
+
+def test_token_search():
+    index = _AppsIndex(APPS)
+
+    result = index.search("ndvi", token=True)
+
+    assert result["total"] == 2
+    assert result["apps"] == [APPS["alice"][0], APPS["bob"][0]]
+
+
+@pytest.mark.parametrize("query", ["-", "   ", "--/"])
+def test_token_search_without_words(query):
+    assert _AppsIndex(APPS).search(query, token=True) == {"total": 0, "apps": []}
+    assert searchApps(query, token=True) == {"total": 0, "apps": []}
@@ -0,0 +1,63 @@
+import ee
+import pytest
+
+from ee_extra.STAC import core
+from ee_extra.STAC.utils import platformCache
+
+BATCHES = [
+    core.getDOIBatch,
+    core.getCitationBatch,
+    core.getScaleParamsBatch,
+    core.getOffsetParamsBatch,
+]
+L8 = "LANDSAT/LC08/C02/T1_L2/LC08_044034_20140318"
+
+
+@pytest.fixture
+def requests(ee_offline, monkeypatch):
+    """Records the getInfo() requests, answered with the system:id of the pending
+    objects of the tests."""
+    sent = []
+
+    def computeValue(obj):
+        sent.append(obj)
+        return ["MODIS/061/MOD09GA", "COPERNICUS/S2_SR/IMAGE"]
+
+    monkeypatch.setattr(ee.data, "computeValue", computeValue)
+    with platformCache(enabled=False):
+        yield sent
+
+
+@pytest.mark.parametrize("batch", BATCHES)
+def test_single_request_for_mixed_items(requests, batch):
+    items = [
+        "COPERNICUS/S2_SR",
+        ee.Image(L8).select(["SR_B4"]),
+        ee.ImageCollection("MODIS/061/MOD09GA").merge(
+            ee.ImageCollection("MODIS/061/MYD09GA")
+        ),
+        ee.Image(L8).set("system:id", "COPERNICUS/S2_SR/IMAGE"),
+    ]
+
+    result = batch(items)
+
+    assert set(result) == {
+        "COPERNICUS/S2_SR",
+        "LANDSAT/LC08/C02/T1_L2",
+        "MODIS/061/MOD09GA",
+    }
+    assert len(requests) == 1
+
+
+@pytest.mark.parametrize("batch", BATCHES)
+def test_no_request_when_resolved_client_side(requests, batch):
+    items = [
+        "COPERNICUS/S2_SR",
+        ee.Image(L8),
+        ee.ImageCollection("MODIS/061/MOD09GA").filterDate("2020-01-01", "2020-02-01"),
+    ]
+
+    result = batch(items)
+
+    assert len(result) == 3
+    assert requests == []
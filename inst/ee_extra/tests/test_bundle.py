@@ -0,0 +1,25 @@
+import json
+import zipfile
+
+import ee_extra.STAC.bundle as bundle
+from ee_extra.fetch import _http_cache
+
+
+def test_build_bypasses_the_cache(stub_server, monkeypatch, tmp_path):
+    records = {
+        ID: {"href": "{}/{}.json".format(stub_server.url, ID.replace("/", "_"))}
+        for ID in ["A/ONE", "A/TWO", "B/THREE"]
+    }
+    monkeypatch.setattr(bundle, "_get_dataset_records", lambda: records)
+    monkeypatch.setattr(_http_cache, "directory", str(tmp_path / "cache"))
+    _http_cache.clear()
+
+    output = str(tmp_path / "stac.zip")
+    errors = bundle.buildSTACBundle(output, match=["A/*"])
+
+    assert errors == {}
+    with zipfile.ZipFile(output) as f:
+        assert sorted(f.namelist()) == ["A/ONE.json", "A/TWO.json"]
+        assert json.loads(f.read("A/ONE.json")) == {"id": "/A_ONE.json"}
+    assert not (tmp_path / "cache").exists()
+    assert _http_cache._read(records["A/ONE"]["href"]) is None
@@ -0,0 +1,96 @@
+import json
+import os
+import shutil
+import sqlite3
+
+from ee_extra import catalog
+from ee_extra.catalog import (
+    CATALOG_FILES,
+    DATA_DIR,
+    RECORD_ROOTS,
+    _CatalogDB,
+    _load_fields,
+    buildCatalog,
+)
+
+FILE = "ee-catalog-scale.json"
+
+
+def _build(tmp_path, name="data"):
+    dataDir = tmp_path / name
+    dataDir.mkdir()
+    shutil.copy(os.path.join(DATA_DIR, FILE), dataDir / FILE)
+    path = buildCatalog(str(dataDir / "catalog.sqlite"), [FILE], str(dataDir))
+    return _CatalogDB(path, str(dataDir)), dataDir / FILE
+
+
+def test_same_size_edit_is_stale(tmp_path):
+    db, json_path = _build(tmp_path)
+    assert db.has(FILE)
+
+    content = json_path.read_text()
+    index = content.index("1.0")
+    edited = content[:index] + "2.0" + content[index + 3 :]
+    assert len(edited) == len(content)
+    json_path.write_text(edited)
+
+    assert not db.has(FILE)
+
+
+def test_path_with_uri_characters(tmp_path):
+    db, _ = _build(tmp_path, "data #1?%20")
+    assert db.has(FILE)
+    assert db.keys(FILE)
+
+
+def test_fields_without_json1(tmp_path, monkeypatch):
+    db, json_path = _build(tmp_path)
+    calls = []
+
+    def project(x, fields):
+        calls.append(x)
+        raise sqlite3.OperationalError("no such function: json_extract")
+
+    monkeypatch.setattr(db, "project", project)
+    monkeypatch.setattr(catalog, "_catalog_db", db)
+
+    fields = _load_fields(FILE, ["SR_B1", "B1"])
+
+    assert calls == [FILE]
+    assert fields == _load_fields(FILE, ["SR_B1", "B1"], str(json_path.parent))
+    assert fields["LANDSAT/LC08/C02/T1_L2"][0] == 2.75e-05
+
+
+def test_build_serves_every_data_file(tmp_path):
+    db = _CatalogDB(buildCatalog(str(tmp_path / "catalog.sqlite")))
+
+    for x in CATALOG_FILES:
+        assert db.has(x), x
+        entries = catalog._iter_entries(os.path.join(DATA_DIR, x), RECORD_ROOTS.get(x))
+        assert db.keys(x) == [key for key, _ in entries], x
+
+
+def test_project_keeps_json_types(tmp_path):
+    records = {
+        "A": {"flag": True, "bands": ["B1"], "name": "[not a list]", "scale": 1},
+        "B": {"flag": False, "bands": [], "name": "b", "scale": 0.5},
+        "C": {"other": None},
+    }
+    (tmp_path / "records.json").write_text(json.dumps(records))
+    path = buildCatalog(
+        str(tmp_path / "catalog.sqlite"), ["records.json"], str(tmp_path)
+    )
+    fields = ["flag", "bands", "name", "scale"]
+
+    projected = _CatalogDB(path, str(tmp_path)).project("records.json", fields)
+
+    assert projected == [
+        (key, tuple(value.get(field) for field in fields))
+        for key, value in records.items()
+    ]
+    assert [type(values[0]) for _, values in projected[:2]] == [bool, bool]
+    sizes = catalog.compareMemory()
+
+    assert set(sizes) == {"ee-catalog-ids.json", "spectral-indices-dict.json"}
+    for x, size in sizes.items():
+        assert 0 < size["records"] < size["dict"], x
@@ -0,0 +1,128 @@
+import ee
+import pytest
+
+from ee_extra.QA import clouds
+from ee_extra.STAC.utils import _get_constant, _get_function_name
+
+S2_SR = "COPERNICUS/S2_SR/20200101T000000_20200101T000000_T01AAA"
+
+
+def _find_all(obj, name):
+    """Finds the nodes of an expression graph, mapped functions included, that call an
+    algorithm."""
+    if isinstance(obj, ee.customfunction.CustomFunction):
+        obj = obj._body
+    if isinstance(obj, ee.List) and obj.func is None:
+        obj = obj._list
+    if isinstance(obj, (list, tuple)):
+        nodes = obj
+    elif isinstance(obj, ee.computedobject.ComputedObject):
+        if _get_function_name(obj.func) == name:
+            yield obj
+        nodes = (obj.args or {}).values()
+    else:
+        return
+    for node in nodes:
+        yield from _find_all(node, name)
+
+
+def _find(obj, name):
+    """Finds the first node of an expression graph that calls an algorithm."""
+    return next(_find_all(obj, name), None)
+
+
+def _joined(masked):
+    """Gets the collection joined to the images of a masked collection."""
+    join = _find(masked, "Join.apply")
+    assert join is not None
+    return join.args["secondary"]
+
+
+@pytest.mark.parametrize(
+    "shadowScale", [0, -20, float("nan"), float("inf"), "20", True]
+)
+def test_invalid_shadow_scale(ee_offline, shadowScale):
+    with pytest.raises(ValueError, match="shadowScale"):
+        clouds.maskClouds(ee.Image(S2_SR), shadowScale=shadowScale)
+
+
+@pytest.mark.parametrize("shadowScale", [10, 20, 60.0])
+def test_valid_shadow_scale(ee_offline, shadowScale):
+    masked = clouds.maskClouds(ee.Image(S2_SR), shadowScale=shadowScale)
+
+    assert isinstance(masked, ee.Image)
+
+
+def test_compare_shadow_scales(ee_offline, monkeypatch):
+    requests = []
+
+    def computeValue(obj):
+        requests.append(obj)
+        return {"mask": 0.25}
+
+    monkeypatch.setattr(ee.data, "computeValue", computeValue)
+
+    result = clouds.compareShadowScales(ee.Image(S2_SR), scales=[20, 60])
+
+    assert list(result) == [10, 20, 60]
+    assert result[10]["agreement"] == 1.0
+    assert result[60]["agreement"] == 0.25
+    assert result[60]["masked"] == 0.25
+    assert result[60]["seconds"] >= 0
+    assert len(requests) == 5
+
+
+@pytest.mark.parametrize(
+    "filtered",
+    [
+        lambda c, g: c.filterDate("2020-01-01", "2020-02-01").filterBounds(g),
+        lambda c, g: c.filter(
+            ee.Filter.And(
+                ee.Filter.date("2020-01-01", "2020-02-01"), ee.Filter.bounds(g)
+            )
+        ),
+    ],
+)
+def test_join_reuses_date_and_bounds_filters(ee_offline, filtered):
+    point = ee.Geometry.Point([0, 0])
+    collection = filtered(ee.ImageCollection("COPERNICUS/S2_SR"), point)
+
+    joined = _joined(clouds.maskClouds(collection))
+    graph = joined.serialize()
+
+    assert '"COPERNICUS/S2_CLOUD_PROBABILITY"' in graph
+    assert '"Filter.dateRangeContains"' in graph
+    assert '"Filter.intersects"' in graph
+    assert "AggregateFeatureCollection" not in graph
+
+
+def test_join_falls_back_to_date_range(ee_offline):
+    collection = ee.ImageCollection("COPERNICUS/S2_SR")
+
+    graph = _joined(clouds.maskClouds(collection)).serialize()
+
+    assert '"AggregateFeatureCollection.min"' in graph
+    assert '"AggregateFeatureCollection.max"' in graph
+
+
+def test_CDI_reads_the_joined_TOA_image(ee_offline):
+    collection = ee.ImageCollection("COPERNICUS/S2_SR").filterDate(
+        "2020-01-01", "2020-02-01"
+    )
+
+    masked = clouds.maskClouds(collection, cdi=-0.5)
+
+    [cdi] = _find_all(masked, "Sentinel2.CDI")
+    source = cdi.args["source"]
+    assert _get_function_name(source.func) == "Element.get"
+    assert _get_constant(source.args["property"]) == "s2_toa"
+    assert source.args["object"].isVariable()
+    # The TOA images are joined once instead of being filtered for each image.
+    joins = list(_find_all(masked, "Join.saveFirst"))
+    assert sorted(_get_constant(join.args["matchKey"]) for join in joins) == [
+        "cloud_mask",
+        "s2_toa",
+    ]
+    assert len(list(_find_all(masked, "Filter.equals"))) == len(joins)
+    graph = masked.serialize()
+    assert graph.count('"Filter.equals"') == 1
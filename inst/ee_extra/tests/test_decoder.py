@@ -0,0 +1,111 @@
+import itertools
+
+import pytest
+
+from ee_extra.QA.decoder import decodeQA, maskQA
+from ee_extra.QA.flags import _BIT_FLAGS
+
+np = pytest.importorskip("numpy")
+
+
+def _random_QA(platform, shape=(37, 23), seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        band: rng.integers(0, 1 << 32, size=shape, dtype=np.uint32)
+        for band in _BIT_FLAGS[platform]
+    }
+
+
+def _flagged(qa, platform, flags):
+    """Decodes the flags one bit at a time, as the per-flag closures used to."""
+    flagged = np.zeros(next(iter(qa.values())).shape, dtype=bool)
+    for band, bandFlags in _BIT_FLAGS[platform].items():
+        for flag in flags:
+            for bit in bandFlags.get(flag, ()):
+                flagged |= (qa[band] >> bit) & 1 == 1
+    return flagged
+
+
+def _input(qa):
+    return qa if len(qa) > 1 else next(iter(qa.values()))
+
+
+@pytest.mark.parametrize("platform", sorted(_BIT_FLAGS))
+def test_maskQA_matches_bit_flags(platform):
+    qa = _random_QA(platform)
+
+    for maskCirrus, maskShadows in itertools.product([True, False], repeat=2):
+        flags = ["cloud"] + ["shadow"] * maskShadows + ["cirrus"] * maskCirrus
+        clear = maskQA(_input(qa), platform, maskCirrus, maskShadows)
+        np.testing.assert_array_equal(clear, ~_flagged(qa, platform, flags))
+
+
+@pytest.mark.parametrize("platform", sorted(_BIT_FLAGS))
+def test_decodeQA_matches_bit_flags(platform):
+    qa = _random_QA(platform)
+
+    decoded = decodeQA(_input(qa), platform)
+
+    flags = {flag for bandFlags in _BIT_FLAGS[platform].values() for flag in bandFlags}
+    assert set(decoded) == flags
+    for flag, flagged in decoded.items():
+        np.testing.assert_array_equal(flagged, _flagged(qa, platform, [flag]))
+
+
+def test_two_QA_bands():
+    qf1 = np.array([[0, 1 << 2], [0, 0]], dtype=np.uint8)
+    qf2 = np.array([[0, 0], [1 << 3, 1 << 7]], dtype=np.uint8)
+    qa = {"QF1": qf1, "QF2": qf2}
+
+    clear = maskQA(qa, "NOAA/VIIRS/001/VNP09GA")
+    decoded = decodeQA(qa, "NOAA/VIIRS/001/VNP09GA")
+
+    np.testing.assert_array_equal(clear, [[True, False], [False, False]])
+    np.testing.assert_array_equal(decoded["cloud"], [[False, True], [False, False]])
+    np.testing.assert_array_equal(decoded["shadow"], [[False, False], [True, False]])
+    np.testing.assert_array_equal(decoded["cirrus"], [[False, False], [False, True]])
+    with pytest.raises(Exception, match="several QA bands"):
+        maskQA(qf1, "NOAA/VIIRS/001/VNP09GA")
+    with pytest.raises(Exception, match="missing"):
+        maskQA({"QF1": qf1}, "NOAA/VIIRS/001/VNP09GA")
+
+
+@pytest.mark.parametrize("chunkSize", [1, 7, 23, 100, 1 << 22])
+def test_chunked_decoding(chunkSize):
+    qa = _random_QA("LANDSAT/LC08/C02/T1_L2", shape=(19, 23))["QA_PIXEL"]
+
+    expected = maskQA(qa, "LANDSAT/LC08/C02/T1_L2")
+    chunked = maskQA(qa, "LANDSAT/LC08/C02/T1_L2", chunkSize=chunkSize)
+
+    np.testing.assert_array_equal(chunked, expected)
+
+
+def test_memmap_input_and_output(tmp_path):
+    qa = _random_QA("MODIS/061/MOD09GA")["state_1km"].astype(np.uint16)
+    path = str(tmp_path / "state_1km.dat")
+    stored = np.memmap(path, dtype=np.uint16, mode="w+", shape=qa.shape)
+    stored[:] = qa
+    stored.flush()
+
+    qaMap = np.memmap(path, dtype=np.uint16, mode="r", shape=qa.shape)
+    out = np.memmap(str(tmp_path / "mask.dat"), dtype=bool, mode="w+", shape=qa.shape)
+    result = maskQA(qaMap, "MODIS/061/MOD09GA", out=out, chunkSize=50)
+
+    assert result is out
+    np.testing.assert_array_equal(out, maskQA(qa, "MODIS/061/MOD09GA"))
+
+
+def test_errors():
+    qa = np.zeros((4, 5), dtype=np.uint16)
+
+    with pytest.raises(Exception, match="not supported"):
+        maskQA(qa, "NOT/A/PLATFORM")
+    with pytest.raises(Exception, match="same shape"):
+        maskQA(
+            {"QF1": qa, "QF2": np.zeros((4, 6), dtype=np.uint16)},
+            "NOAA/VIIRS/001/VNP09GA",
+        )
+    with pytest.raises(Exception, match="boolean array of shape"):
+        maskQA(qa, "MODIS/061/MOD09GA", out=np.empty((5, 4), dtype=bool))
+    with pytest.raises(Exception, match="boolean array of shape"):
+        maskQA(qa, "MODIS/061/MOD09GA", out=np.empty((4, 5), dtype=np.uint8))
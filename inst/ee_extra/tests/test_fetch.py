@@ -0,0 +1,136 @@
+import os
+import urllib.error
+
+import pytest
+
+from ee_extra.fetch import _HTTPCache
+
+
+def test_memory_cache_by_default(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    cache = _HTTPCache()
+    url = stub_server.url + "/a.json"
+
+    assert cache.fetchJSON(url) == {"id": "/a.json"}
+    assert cache.fetchJSON(url) == {"id": "/a.json"}
+
+    assert len(stub_server.hits) == 1
+    assert cache.directory is None
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_stale_entries_are_revalidated(stub_server):
+    cache = _HTTPCache(ttl=0)
+    url = stub_server.url + "/a.json"
+
+    first = cache.fetch(url)
+    second = cache.fetch(url)
+
+    assert first == second
+    assert [headers.get("If-None-Match") for _, headers in stub_server.hits] == [
+        None,
+        '"v1"',
+    ]
+
+
+def test_disk_cache_is_persistent(stub_server, tmp_path):
+    url = stub_server.url + "/a.json"
+
+    _HTTPCache(directory=str(tmp_path)).fetch(url)
+    body = _HTTPCache(directory=str(tmp_path)).fetch(url)
+
+    assert body
+    assert len(stub_server.hits) == 1
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_offline(stub_server):
+    cache = _HTTPCache(ttl=0)
+    url = stub_server.url + "/a.json"
+    body = cache.fetch(url)
+
+    cache.offline = True
+    assert cache.fetch(url) == body
+    with pytest.raises(ConnectionError):
+        cache.fetch(stub_server.url + "/b.json")
+    assert len(stub_server.hits) == 1
+
+
+def test_stale_copy_when_unreachable(stub_server):
+    cache = _HTTPCache(ttl=0, timeout=1)
+    url = stub_server.url + "/a.json"
+    body = cache.fetch(url)
+
+    stub_server.routes["/a.json"] = (500, {}, b"")
+    with pytest.warns(UserWarning):
+        assert cache.fetch(url) == body
+
+
+def test_size_bound(stub_server):
+    cache = _HTTPCache()
+    cache.fetch(stub_server.url + "/a.json")
+    cache.maxsize = len(cache.fetch(stub_server.url + "/b.json"))
+
+    cache.fetch(stub_server.url + "/c.json")
+
+    assert cache._read(stub_server.url + "/a.json") is None
+    assert cache._read(stub_server.url + "/b.json") is None
+    assert cache._read(stub_server.url + "/c.json") is not None
+
+
+def test_connections_are_reused(stub_server):
+    cache = _HTTPCache()
+    for name in ["a", "b", "c"]:
+        cache.fetch("{}/{}.json".format(stub_server.url, name))
+
+    assert len(stub_server.hits) == 3
+    assert len(stub_server.clients) == 1
+
+
+def test_redirects(stub_server):
+    stub_server.routes["/old.json"] = (301, {"Location": "/a.json"}, b"")
+    assert _HTTPCache().fetchJSON(stub_server.url + "/old.json") == {"id": "/a.json"}
+
+
+def test_redirect_loop_is_an_error(stub_server):
+    stub_server.routes["/loop.json"] = (302, {"Location": "/loop.json"}, b"")
+    cache = _HTTPCache()
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        cache.fetch(stub_server.url + "/loop.json")
+
+    assert isinstance(error.value.msg, str)
+    assert len(stub_server.hits) == 6
+    assert cache._read(stub_server.url + "/loop.json") is None
+
+
+def test_redirect_without_location_is_an_error(stub_server):
+    stub_server.routes["/moved.json"] = (302, {}, b"")
+    cache = _HTTPCache()
+
+    with pytest.raises(urllib.error.HTTPError):
+        cache.fetch(stub_server.url + "/moved.json")
+
+    assert len(stub_server.hits) == 1
+    assert cache._read(stub_server.url + "/moved.json") is None
+
+
+def test_proxy_from_environment(stub_server, monkeypatch):
+    proxy = stub_server.url.replace("http://", "http://user:secret@")
+    monkeypatch.setenv("http_proxy", proxy)
+    monkeypatch.setenv("HTTP_PROXY", proxy)
+    monkeypatch.delenv("no_proxy", raising=False)
+    monkeypatch.delenv("NO_PROXY", raising=False)
+
+    _HTTPCache().fetch("http://stac.example.com/a.json")
+
+    path, headers = stub_server.hits[0]
+    assert path == "http://stac.example.com/a.json"
+    assert headers["Proxy-Authorization"] == "Basic dXNlcjpzZWNyZXQ="
+
+
+def test_no_proxy(stub_server, monkeypatch):
+    monkeypatch.setenv("http_proxy", "http://127.0.0.1:9")
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+
+    assert _HTTPCache().fetchJSON(stub_server.url + "/a.json") == {"id": "/a.json"}
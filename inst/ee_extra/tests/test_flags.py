@@ -0,0 +1,43 @@
+import ee
+import pytest
+
+from ee_extra.QA.clouds import maskClouds
+from ee_extra.QA.flags import _BIT_FLAGS, _compile_bit_flags
+
+ALL = ["cloud", "shadow", "cirrus"]
+
+
+@pytest.mark.parametrize(
+    "platform, flags, masks",
+    [
+        ("COPERNICUS/S3/OLCI", ALL, {"quality_flags": 1 << 27}),
+        ("LANDSAT/LC08/C01/T1_SR", ALL, {"pixel_qa": 0b101000}),
+        ("LANDSAT/LC08/C02/T1_L2", ALL, {"QA_PIXEL": 0b11100}),
+        ("LANDSAT/LC09/C02/T1_L2", ["cloud"], {"QA_PIXEL": 0b1000}),
+        ("LANDSAT/LE07/C02/T1_L2", ALL, {"QA_PIXEL": 0b11000}),
+        ("LANDSAT/LT05/C02/T1_L2", ["cloud", "cirrus"], {"QA_PIXEL": 0b1000}),
+        ("MODIS/061/MOD09GA", ALL, {"state_1km": 0b100000101}),
+        ("MODIS/061/MOD09GA", ["cloud", "shadow"], {"state_1km": 0b101}),
+        ("MODIS/006/MOD09Q1", ["cloud"], {"State": 0b1}),
+        ("MODIS/061/MYD09A1", ALL, {"StateQA": 0b100000101}),
+        ("MODIS/061/MCD15A3H", ALL, {"FparExtra_QC": 0b1110000}),
+        ("MODIS/061/MOD17A2H", ALL, {"Psn_QC": 0b1000}),
+        ("MODIS/061/MOD16A2", ALL, {"ET_QC": 0b1000}),
+        ("MODIS/061/MOD13Q1", ALL, {"SummaryQA": 0b1}),
+        ("NOAA/VIIRS/001/VNP09GA", ALL, {"QF1": 0b100, "QF2": 0b11001000}),
+        ("NOAA/VIIRS/001/VNP09GA", ["cirrus"], {"QF2": 0b11000000}),
+        ("NOAA/VIIRS/001/VNP09GA", ["cloud"], {"QF1": 0b100}),
+        ("COPERNICUS/S3/OLCI", ["shadow"], {}),
+    ],
+)
+def test_compiled_masks(platform, flags, masks):
+    assert _compile_bit_flags(platform, flags) == masks
+
+
+@pytest.mark.parametrize("platform", sorted(_BIT_FLAGS))
+def test_one_bitwiseAnd_per_QA_band(ee_offline, platform):
+    img = ee.Image(platform + "/IMAGE")
+
+    graph = maskClouds(img, platformDict={"platform": platform}).serialize()
+
+    assert graph.count('"Image.bitwiseAnd"') == len(_BIT_FLAGS[platform])
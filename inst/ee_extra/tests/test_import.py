@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+# Budget in seconds for `import ee_extra` in a fresh interpreter. Importing the
+# package must not import any submodule, so it only pays for ee_extra/__init__.py.
+IMPORT_BUDGET = 0.1
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import ee_extra
+elapsed = time.perf_counter() - start
+loaded = sorted(m for m in sys.modules if m.startswith("ee_extra."))
+print(json.dumps({"elapsed": elapsed, "loaded": loaded}))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_ee_extra():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [ROOT] + [path for path in [env.get("PYTHONPATH")] if path]
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        env=env,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    return json.loads(output)
+
+
+def test_import_loads_no_submodules():
+    assert _import_ee_extra()["loaded"] == []
+
+
+def test_import_time_budget():
+    # The best of a few runs, to be robust to noise on busy machines.
+    elapsed = min(_import_ee_extra()["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET, "import ee_extra took {:.3f} s".format(elapsed)
+
+
+def test_lazy_attribute_access():
+    import ee_extra
+
+    assert "Spectral" in dir(ee_extra)
+    assert ee_extra.catalog.__name__ == "ee_extra.catalog"
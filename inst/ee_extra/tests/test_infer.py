@@ -0,0 +1,77 @@
+import ee
+import pytest
+
+from ee_extra.STAC.utils import _get_platform_STAC, _infer_asset_id, platformCache
+
+
+class _Requests(list):
+    """getInfo() requests, all answered with the system:id in answer."""
+
+    answer = "COPERNICUS/S2_SR/20200101T000000_20200101T000000_T01AAA"
+
+
+@pytest.fixture
+def requests(ee_offline, monkeypatch):
+    sent = _Requests()
+
+    def computeValue(obj):
+        sent.append(obj)
+        return sent.answer
+
+    monkeypatch.setattr(ee.data, "computeValue", computeValue)
+    with platformCache(enabled=False):
+        yield sent
+
+
+def test_filtered_and_mapped_collection(requests):
+    collection = ee.ImageCollection("COPERNICUS/S2_SR").filterDate(
+        "2020-01-01", "2020-02-01"
+    )
+    img = collection.map(lambda img: img.updateMask(img.select("B4"))).first()
+
+    assert _infer_asset_id(img) == ("COPERNICUS/S2_SR", True)
+    assert _get_platform_STAC(img)["platform"] == "COPERNICUS/S2_SR"
+    assert requests == []
+
+
+def test_selected_and_clipped_image(requests):
+    ID = "LANDSAT/LC08/C02/T1_L2/LC08_044034_20140318"
+    img = ee.Image(ID).select(["SR_B4", "SR_B5"]).clip(ee.Geometry.Point([0, 0]))
+
+    assert _infer_asset_id(img) == (ID, False)
+    assert _get_platform_STAC(img)["platform"] == "LANDSAT/LC08/C02/T1_L2"
+    assert requests == []
+
+
+def test_unsupported_algorithm_falls_back_to_the_server(requests):
+    collection = ee.ImageCollection("LANDSAT/LC08/C02/T1_L2").merge(
+        ee.ImageCollection("COPERNICUS/S2_SR")
+    )
+
+    requests.answer = "COPERNICUS/S2_SR"
+
+    assert _infer_asset_id(collection) is None
+    assert _get_platform_STAC(collection)["platform"] == "COPERNICUS/S2_SR"
+    assert len(requests) == 1
+
+
+@pytest.mark.parametrize(
+    "setter",
+    [
+        lambda img: img.set("system:id", "COPERNICUS/S2_SR/IMAGE"),
+        lambda img: img.set({"CLOUDY": 1, "system:id": "COPERNICUS/S2_SR/IMAGE"}),
+        lambda img: img.set(ee.String("system:").cat("id"), "COPERNICUS/S2_SR/IMAGE"),
+    ],
+)
+def test_setting_the_system_id_falls_back_to_the_server(requests, setter):
+    img = setter(ee.Image("LANDSAT/LC08/C02/T1_L2/LC08_044034_20140318"))
+
+    assert _infer_asset_id(img) is None
+    assert _get_platform_STAC(img)["platform"] == "COPERNICUS/S2_SR"
+    assert len(requests) == 1
+
+
+def test_setting_other_properties(requests):
+    ID = "LANDSAT/LC08/C02/T1_L2/LC08_044034_20140318"
+
+    assert _infer_asset_id(ee.Image(ID).set("CLOUDY", 1)) == (ID, False)
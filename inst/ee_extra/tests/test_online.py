@@ -0,0 +1,36 @@
+import warnings
+
+from ee_extra import utils
+from ee_extra.fetch import _HTTPCache
+
+
+def test_failed_downloads_are_memoized(stub_server, monkeypatch):
+    monkeypatch.setattr(utils, "_online_memo", {})
+    monkeypatch.setattr(utils, "_http_cache", _HTTPCache())
+    stub_server.routes["/apps.json"] = (503, {}, b"")
+    url = stub_server.url + "/apps.json"
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        first = utils._load_online_JSON(url, "ee-appshot.json")
+        second = utils._load_online_JSON(url, "ee-appshot.json")
+
+    assert first is second
+    assert len(stub_server.hits) == 1
+    assert len(caught) == 1
+
+
+def test_failed_downloads_are_retried(stub_server, monkeypatch):
+    monkeypatch.setattr(utils, "_online_memo", {})
+    monkeypatch.setattr(utils, "_http_cache", _HTTPCache())
+    monkeypatch.setattr(utils, "_ONLINE_RETRY", 0)
+    stub_server.routes["/apps.json"] = (503, {}, b"")
+    url = stub_server.url + "/apps.json"
+
+    with warnings.catch_warnings(record=True):
+        warnings.simplefilter("always")
+        utils._load_online_JSON(url, "ee-appshot.json")
+    del stub_server.routes["/apps.json"]
+
+    assert utils._load_online_JSON(url, "ee-appshot.json") == {"id": "/apps.json"}
+    assert len(stub_server.hits) == 2
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from ee_extra.STAC.utils import _platform_cache, platformCache
+
+
+def test_settings_are_restored():
+    previous = (_platform_cache.maxsize, _platform_cache.ttl)
+
+    with platformCache(maxsize=3, ttl=10) as cache:
+        assert (cache.maxsize, cache.ttl) == (3, 10)
+
+    assert (_platform_cache.maxsize, _platform_cache.ttl) == previous
+
+
+def test_settings_are_restored_on_error():
+    previous = (_platform_cache.maxsize, _platform_cache.ttl)
+
+    with pytest.raises(RuntimeError):
+        with platformCache(maxsize=3, enabled=False):
+            assert not _platform_cache.enabled
+            raise RuntimeError
+
+    assert (_platform_cache.maxsize, _platform_cache.ttl) == previous
+    assert _platform_cache.enabled
+
+
+def test_ttl_can_be_set_to_none():
+    with platformCache(ttl=10):
+        with platformCache(ttl=None) as cache:
+            assert cache.ttl is None
+        assert _platform_cache.ttl == 10
+
+
+def test_smaller_maxsize_evicts_immediately():
+    with platformCache(clear=True):
+        for i in range(5):
+            _platform_cache.set(str(i), "ID{}".format(i))
+
+        with platformCache(maxsize=2):
+            assert [_platform_cache.get(str(i)) for i in range(5)] == [
+                None,
+                None,
+                None,
+                "ID3",
+                "ID4",
+            ]
+    _platform_cache.clear()
+
+
+def test_settings_are_per_thread():
+    previous = (_platform_cache.maxsize, _platform_cache.ttl)
+    entered = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def worker():
+        with platformCache(maxsize=100, ttl=5):
+            entered.set()
+            release.wait(5)
+            seen.append((_platform_cache.maxsize, _platform_cache.ttl))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    entered.wait(5)
+    # Blocks of different threads overlap and exit out of order.
+    with platformCache(maxsize=3, ttl=10):
+        assert (_platform_cache.maxsize, _platform_cache.ttl) == (3, 10)
+        release.set()
+        thread.join(5)
+        assert (_platform_cache.maxsize, _platform_cache.ttl) == (3, 10)
+
+    assert seen == [(100, 5)]
+    assert (_platform_cache.maxsize, _platform_cache.ttl) == previous
@@ -0,0 +1,77 @@
+import ee
+
+from ee_extra.STAC import core
+from ee_extra.STAC.utils import _get_function_name
+
+PLATFORM = {"platform": "TEST/ASSET"}
+
+
+def _catalog(monkeypatch, scale, offset):
+    monkeypatch.setattr(core, "getScaleParams", lambda x, platformDict=None: scale)
+    monkeypatch.setattr(core, "getOffsetParams", lambda x, platformDict=None: offset)
+
+
+def test_identity_parameters_keep_only_catalog_bands(ee_offline, monkeypatch):
+    _catalog(monkeypatch, {"B1": 1, "B2": 1}, {"B1": 0, "B2": 0})
+    img = ee.Image("TEST/ASSET").select(["B1", "B2", "QA"])
+
+    scaled = core.scaleAndOffset(img, PLATFORM)
+
+    assert scaled is not img
+    assert _get_function_name(scaled.func) == "Image.select"
+    assert scaled.args["input"] is img
+
+
+def test_identity_parameters_select_bands_of_collections(ee_offline, monkeypatch):
+    _catalog(monkeypatch, {"B1": 1}, {"B1": 0})
+    collection = ee.ImageCollection("TEST/ASSET")
+
+    scaled = core.scaleAndOffset(collection, PLATFORM)
+
+    assert scaled is not collection
+    assert _get_function_name(scaled.func) == "Collection.map"
+
+
+def test_selected_bands_are_scaled_client_side(ee_offline, monkeypatch):
+    _catalog(monkeypatch, {"B1": 0.5, "B2": 1}, {"B1": 0, "B2": 0})
+    img = ee.Image("TEST/ASSET").select(["QA", "B2", "B1"])
+
+    scaled = core.scaleAndOffset(img, PLATFORM)
+
+    # Bands missing from the catalog are dropped as in the server-side matching.
+    assert _get_function_name(scaled.func) == "Image.select"
+    assert scaled.args["bandSelectors"]._list == ["B2", "B1"]
+    added = scaled.args["input"].args["srcImg"]
+    assert _get_function_name(added.func) == "Image.multiply"
+    assert added.args["image1"].args["bandSelectors"]._list == ["B1"]
+
+
+def test_asset_bands_are_matched_server_side(ee_offline, monkeypatch):
+    _catalog(monkeypatch, {"B1": 0.5, "B2": 1}, {"B1": 0, "B2": 0})
+    img = ee.Image("TEST/ASSET")
+
+    scaled = core.scaleAndOffset(img, PLATFORM)
+
+    # Images of an asset may lack catalog bands, so their bands are looked up.
+    assert '"Image.bandNames"' in scaled.serialize()
+
+
+def test_selected_bands_of_collections_are_scaled_client_side(ee_offline):
+    collection = ee.ImageCollection("COPERNICUS/S2_SR").select(["B4", "B8", "SCL"])
+    collection = collection.filterDate("2020-01-01", "2020-02-01")
+
+    graph = core.scaleAndOffset(collection).serialize()
+
+    assert '"Image.bandNames"' not in graph
+    assert '"Image.multiply"' in graph
+
+
+def test_mapped_functions_are_matched_server_side(ee_offline, monkeypatch):
+    _catalog(monkeypatch, {"B1": 0.5}, {"B1": 0})
+    collection = ee.ImageCollection("TEST/ASSET").map(
+        lambda img: img.select(["B1"]).addBands(img)
+    )
+
+    graph = core.scaleAndOffset(collection, PLATFORM).serialize()
+
+    assert '"Image.bandNames"' in graph
@@ -0,0 +1,14 @@
+from ee_extra.STAC.core import searchDatasets
+
+
+def test_mission_names_match_abbreviated_ids():
+    results = searchDatasets("sentinel 2", n=3)
+    assert results and all(ID.startswith("COPERNICUS/S2") for ID in results)
+
+
+def test_fuzzy_mission_name():
+    assert searchDatasets("sentinal 2", n=3) == searchDatasets("sentinel 2", n=3)
+
+
+def test_prefix():
+    assert searchDatasets("landsat 8 l2", n=1)[0].startswith("LANDSAT/LC08/C02")
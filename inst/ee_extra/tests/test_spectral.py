@@ -0,0 +1,60 @@
+import ee
+import pytest
+
+from ee_extra.Spectral.core import indices, spectralIndices
+from ee_extra.Spectral.utils import _evaluate_formula, _get_raw_formula
+from ee_extra.STAC.core import getOffsetParams, getScaleParams
+from ee_extra.STAC.utils import _get_function_name
+
+S2_SR = "COPERNICUS/S2_SR/20200101T000000_20200101T000000_T01AAA"
+LC08_C2 = {"platform": "LANDSAT/LC08/C02/T1_L2", "sr": True}
+
+
+def test_raw_bands_are_cast_to_float(ee_offline):
+    img = ee.Image(S2_SR)
+
+    scaled = spectralIndices(img, "NDVI", scaled=True)
+    raw = spectralIndices(img, "NDVI", scaled=False)
+    scaledMap = scaled.args["srcImg"].args["input"].args
+    rawMap = raw.args["srcImg"].args["input"].args
+
+    # NDVI is scale invariant on Sentinel-2, so the raw bands are used as they are
+    # but as floats: integer divisions would truncate the index to 0.
+    for var in ["N", "R"]:
+        assert _get_function_name(scaledMap[var].func) == "Image.select"
+        assert _get_function_name(rawMap[var].func) == "Image.toFloat"
+        assert rawMap[var].args["value"].serialize() == scaledMap[var].serialize()
+
+
+@pytest.mark.parametrize("index", ["NDVI", "EVI", "SAVI", "NBR"])
+def test_raw_formula_matches_scaled_formula(index):
+    formula = indices()[index]["formula"]
+    scaleParams = getScaleParams(None, LC08_C2)
+    offsetParams = getOffsetParams(None, LC08_C2)
+    parameters = {"g": 2.5, "C1": 6.0, "C2": 7.5, "L": 1.0}
+    bands = {"B": "SR_B2", "R": "SR_B4", "N": "SR_B5", "S2": "SR_B7"}
+    raw = {"B": 8500, "R": 9000, "N": 21000, "S2": 12000}
+    scaled = {
+        var: raw[var] * scaleParams[band] + offsetParams[band]
+        for var, band in bands.items()
+    }
+
+    rawFormula, rawVariables = _get_raw_formula(
+        formula, LC08_C2, scaleParams, offsetParams, parameters
+    )
+
+    # The raw bands are floats (see test_raw_bands_are_cast_to_float).
+    expected = _evaluate_formula(formula, {**parameters, **scaled})
+    value = _evaluate_formula(
+        rawFormula,
+        {**parameters, **rawVariables, **{k: float(v) for k, v in raw.items()}},
+    )
+    assert value == pytest.approx(expected)
+
+
+def test_formulas_with_literals():
+    variables = {"N": 0.4, "R": 0.1}
+
+    value = _evaluate_formula("2.5 * (N - R) / (N + 6 * R + 1) + -1 ** 2", variables)
+
+    assert value == pytest.approx(2.5 * (0.4 - 0.1) / (0.4 + 6 * 0.1 + 1) + -(1**2))
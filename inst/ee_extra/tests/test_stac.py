@@ -0,0 +1,69 @@
+import threading
+import time
+
+import ee_extra.STAC.core as core
+from ee_extra.fetch import _HTTPCache
+from ee_extra.STAC.core import getSTACs
+from ee_extra.utils import _load_JSON_fields
+
+
+def test_getSTACs(monkeypatch):
+    monkeypatch.setattr(core, "_fetch_STAC", lambda platform: {"id": platform})
+    IDs = ["COPERNICUS/S2_SR", "LANDSAT/LC08/C01/T1_SR", "NOT/A/DATASET"]
+
+    results = {item: (stac, error) for item, stac, error in getSTACs(IDs)}
+
+    assert results["COPERNICUS/S2_SR"] == ({"id": "COPERNICUS/S2_SR"}, None)
+    assert results["LANDSAT/LC08/C01/T1_SR"][0] == {"id": "LANDSAT/LC08/C01/T1_SR"}
+    stac, error = results["NOT/A/DATASET"]
+    assert stac is None and error is not None
+
+
+def test_closing_getSTACs_cancels_pending_fetches(monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def fetch(platform):
+        started.append(platform)
+        if len(started) > 1:
+            release.wait(5)
+        return {"id": platform}
+
+    monkeypatch.setattr(core, "_fetch_STAC", fetch)
+    IDs = ["COPERNICUS/S2_SR", "COPERNICUS/S2", "LANDSAT/LC08/C01/T1_SR"] * 10
+
+    results = getSTACs(IDs, maxWorkers=2)
+    next(results)
+    start = time.perf_counter()
+    results.close()
+    elapsed = time.perf_counter() - start
+    release.set()
+
+    assert elapsed < 1
+    assert len(started) < len(IDs)
+
+
+def test_getSTACs_fetches_concurrently(stub_server, monkeypatch):
+    monkeypatch.setattr(core, "_stac_bundle", {})
+    monkeypatch.setattr(core, "_http_cache", _HTTPCache())
+    monkeypatch.setattr(
+        core,
+        "_load_record",
+        lambda x, platform: {"href": "{}/{}.json".format(stub_server.url, platform)},
+    )
+    stub_server.delay = 0.1
+    IDs = list(_load_JSON_fields("ee-catalog-ids.json"))[:24]
+    maxWorkers = 4
+
+    start = time.perf_counter()
+    results = list(getSTACs(IDs, maxWorkers=maxWorkers))
+    elapsed = time.perf_counter() - start
+
+    assert sorted(stac["id"] for _, stac, _ in results) == sorted(
+        "/{}.json".format(ID) for ID in IDs
+    )
+    # 24 requests of 0.1 s take 2.4 s one by one and 0.6 s four at a time.
+    assert stub_server.concurrency == maxWorkers
+    assert len(IDs) * stub_server.delay / maxWorkers <= elapsed < 1.5
+    # Each thread keeps reusing its keep-alive connection.
+    assert len(stub_server.clients) == maxWorkers